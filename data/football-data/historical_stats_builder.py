@@ -10,13 +10,26 @@
 #
 # Output:
 #   value/team_stats.json
+#
+# Engines:
+#   numpy  (default) typed columns + vectorized last-N
+#   python           per-team season streams, heapq-merged by date
 # =========================================================
 
+import argparse
 import csv
+import hashlib
+import heapq
 import os
 import json
+from collections import deque
+from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import count
 from statistics import mean
 
+import numpy as np
+
 # =========================
 # CONFIG (LOCKED)
 # =========================
@@ -25,6 +38,28 @@ DATA_ROOT = "data/football-data"
 OUTPUT_FILE = "value/team_stats.json"
 LAST_N_MATCHES = 20
 
+# football-data.co.uk: dd/mm/yy (older seasons) or dd/mm/yyyy
+DATE_FORMATS = ("%d/%m/%Y", "%d/%m/%y")
+
+# parsed seasons, one .npz per CSV; a season is re-parsed only when its
+# source changes (size/mtime, then content hash)
+CACHE_DIR = "data/cache/football-data"
+CACHE_VERSION = 1
+SEASON_KEYS = ("teams", "home", "away", "hg", "ag", "date", "odds")
+
+# 1X2 odds kept for downstream stages: Bet365, Pinnacle, market max/avg,
+# opening and closing ("C") lines
+ODDS_COLUMNS = (
+    "B365H", "B365D", "B365A",
+    "PSH", "PSD", "PSA",
+    "MaxH", "MaxD", "MaxA",
+    "AvgH", "AvgD", "AvgA",
+    "B365CH", "B365CD", "B365CA",
+    "PSCH", "PSCD", "PSCA",
+    "MaxCH", "MaxCD", "MaxCA",
+    "AvgCH", "AvgCD", "AvgCA",
+)
+
 # =========================
 # HELPERS
 # =========================
@@ -39,18 +74,25 @@ def load_csv(path):
         return list(csv.DictReader(f))
 
 
-# =========================
-# MAIN
-# =========================
+@lru_cache(maxsize=None)
+def parse_date(val):
+    """Match date as epoch days (UTC), -1 when missing or unparseable."""
+    for fmt in DATE_FORMATS:
+        try:
+            dt = datetime.strptime(val.strip(), fmt).replace(tzinfo=timezone.utc)
+        except (AttributeError, ValueError):
+            continue
+        return int(dt.timestamp()) // 86400
+    return -1
 
-def run_builder():
-    team_matches = {}
-    total_csv = 0
-    total_matches = 0
 
-    # ---------------------------------------------
-    # Traverse league folders
-    # ---------------------------------------------
+def ratio(total, n):
+    # same values as statistics.mean over n ints (an int when exact)
+    total, n = int(total), int(n)
+    return total // n if total % n == 0 else total / n
+
+
+def iter_csv_files():
     for league in sorted(os.listdir(DATA_ROOT)):
         league_path = os.path.join(DATA_ROOT, league)
 
@@ -63,54 +105,342 @@ def run_builder():
             if not fname.lower().endswith(".csv"):
                 continue
 
-            total_csv += 1
-            fpath = os.path.join(league_path, fname)
             print(f"  [LOAD] {league}/{fname}")
+            yield os.path.join(league_path, fname)
+
 
-            rows = load_csv(fpath)
+def write_output(team_stats):
+    os.makedirs("value", exist_ok=True)
 
-            for r in rows:
+    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
+        json.dump(team_stats, f, ensure_ascii=False, indent=2)
+
+# =========================
+# SEASON PARSER (TYPED COLUMNS)
+# =========================
+
+def parse_season(path):
+    """One season CSV as typed columns (team ids local to the season)."""
+    team_ids = {}
+    home, away, hg, ag, date, odds = [], [], [], [], [], []
+
+    def team(name):
+        tid = team_ids.get(name)
+        if tid is None:
+            tid = team_ids[name] = len(team_ids)
+        return tid
+
+    def price(row, i):
+        try:
+            return float(row[i])
+        except (IndexError, TypeError, ValueError):
+            return np.nan
+
+    with open(path, newline="", encoding="utf-8", errors="ignore") as f:
+        reader = csv.reader(f)
+        header = [h.lstrip("\ufeff").strip() for h in next(reader, [])]
+        col = {h: i for i, h in enumerate(header)}
+        ih, ia = col.get("HomeTeam"), col.get("AwayTeam")
+        ihg, iag = col.get("FTHG"), col.get("FTAG")
+        idate = col.get("Date")
+        iodds = [col.get(c) for c in ODDS_COLUMNS]
+
+        if None not in (ih, ia, ihg, iag):
+            for row in reader:
                 try:
-                    home = r["HomeTeam"].strip()
-                    away = r["AwayTeam"].strip()
-                    hg = int(r["FTHG"])
-                    ag = int(r["FTAG"])
-                except Exception:
+                    h = row[ih].strip()
+                    a = row[ia].strip()
+                    goals = int(row[ihg]), int(row[iag])
+                except (IndexError, ValueError):
                     continue
 
-                total_matches += 1
+                # home before away: ids follow first appearance, like the dict path
+                home.append(team(h))
+                away.append(team(a))
+                hg.append(goals[0])
+                ag.append(goals[1])
+                date.append(parse_date(row[idate]) if idate is not None and idate < len(row) else -1)
+                odds.append([price(row, i) if i is not None else np.nan for i in iodds])
+
+    return {
+        "teams": np.asarray(list(team_ids), dtype=str),
+        "home": np.asarray(home, dtype=np.int32),
+        "away": np.asarray(away, dtype=np.int32),
+        "hg": np.asarray(hg, dtype=np.int16),
+        "ag": np.asarray(ag, dtype=np.int16),
+        "date": np.asarray(date, dtype=np.int32),
+        "odds": np.asarray(odds, dtype=np.float64).reshape(len(home), len(ODDS_COLUMNS)),
+    }
+
+# =========================
+# PARSED-SEASON CACHE (.npz)
+# =========================
+
+def file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_path(path):
+    league = os.path.basename(os.path.dirname(path))
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(CACHE_DIR, f"{league}__{stem}.npz")
+
+
+def load_cached_season(path, st):
+    """
+    Cached columns if the entry matches the CSV's (size, mtime) or, failing
+    that, its content hash. Returns (season or None, sha1 if computed).
+    """
+    cpath = cache_path(path)
+    if not os.path.exists(cpath):
+        return None, None
+
+    try:
+        with np.load(cpath, allow_pickle=False) as z:
+            meta = json.loads(str(z["meta"]))
+            season = {k: z[k] for k in SEASON_KEYS}
+    except (OSError, ValueError, KeyError):
+        return None, None
+
+    if meta.get("version") != CACHE_VERSION or meta.get("odds_columns") != list(ODDS_COLUMNS):
+        return None, None
+    if meta.get("size") == st.st_size and meta.get("mtime_ns") == st.st_mtime_ns:
+        return season, None
+
+    # touched but maybe unchanged
+    digest = file_sha1(path)
+    return (season if meta.get("sha1") == digest else None), digest
+
+
+def save_cached_season(path, st, digest, season):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    meta = {
+        "version": CACHE_VERSION,
+        "source": path,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha1": digest,
+        "odds_columns": list(ODDS_COLUMNS),
+    }
+
+    cpath = cache_path(path)
+    tmp = cpath + ".tmp.npz"
+    np.savez_compressed(tmp, meta=np.asarray(json.dumps(meta)), **season)
+    os.replace(tmp, cpath)
+
+
+def load_season(path, use_cache=True):
+    """Parsed season columns, from the cache when valid; returns (season, hit)."""
+    if not use_cache:
+        return parse_season(path), False
+
+    st = os.stat(path)
+    season, digest = load_cached_season(path, st)
+    if season is not None:
+        if digest is not None:
+            # same content, new mtime: re-key so the next run skips hashing
+            save_cached_season(path, st, digest, season)
+        return season, True
+
+    season = parse_season(path)
+    save_cached_season(path, st, digest or file_sha1(path), season)
+    return season, False
+
+# =========================
+# NUMPY ENGINE (COLUMNAR)
+# =========================
+
+class Columns:
+    """All seasons' match columns; team names factorized to global int ids."""
+
+    def __init__(self):
+        self.team_ids = {}
+        self.teams = []
+        self.chunks = []
+
+    def team(self, name):
+        tid = self.team_ids.get(name)
+        if tid is None:
+            tid = self.team_ids[name] = len(self.teams)
+            self.teams.append(name)
+        return tid
+
+    def add_season(self, season):
+        # local ids are in first-appearance order, so global ids stay so too
+        remap = np.asarray([self.team(str(t)) for t in season["teams"]], dtype=np.int32)
+        chunk = dict(season)
+        chunk["home"] = remap[season["home"]] if len(season["home"]) else season["home"]
+        chunk["away"] = remap[season["away"]] if len(season["away"]) else season["away"]
+        self.chunks.append(chunk)
+        return len(season["hg"])
+
+    def column(self, key, dtype):
+        if not self.chunks:
+            return np.zeros(0, dtype=dtype)
+        return np.concatenate([c[key] for c in self.chunks]).astype(dtype, copy=False)
+
+    def arrays(self):
+        return (
+            self.column("home", np.int32),
+            self.column("away", np.int32),
+            self.column("hg", np.int16),
+            self.column("ag", np.int16),
+            self.column("date", np.int32),
+        )
+
+    def odds(self):
+        """Match odds, one column per ODDS_COLUMNS entry (NaN when not shipped)."""
+        if not self.chunks:
+            return np.zeros((0, len(ODDS_COLUMNS)))
+        return np.concatenate([c["odds"] for c in self.chunks])
+
+
+def load_columns(use_cache=True):
+    """Every season under DATA_ROOT as Columns; returns (columns, files, cache hits)."""
+    cols = Columns()
+    files = hits = 0
+
+    for fpath in iter_csv_files():
+        season, hit = load_season(fpath, use_cache)
+        cols.add_season(season)
+        files += 1
+        hits += hit
+
+    return cols, files, hits
+
+
+def last_n_stats(home, away, hg, ag, date, n_teams, last_n):
+    """
+    Per-team sums over each team's last `last_n` matches by date (ingest
+    order on ties, undated rows oldest). Every match is two team-perspective
+    rows; one sort groups them.
+    """
+    n_matches = len(home)
+    team = np.concatenate([home, away])
+    gf = np.concatenate([hg, ag]).astype(np.int64)
+    ga = np.concatenate([ag, hg]).astype(np.int64)
+    day = np.concatenate([date, date])
+    order = np.concatenate([np.arange(n_matches), np.arange(n_matches)])
+
+    # rows grouped by team, each group in date order
+    idx = np.lexsort((order, day, team))
+    team, gf, ga = team[idx], gf[idx], ga[idx]
+
+    counts = np.bincount(team, minlength=n_teams)
+    group_end = np.cumsum(counts)
+    from_end = group_end[team] - 1 - np.arange(len(team))
+    keep = from_end < last_n
+
+    team, gf, ga = team[keep], gf[keep], ga[keep]
+    btts = ((gf > 0) & (ga > 0)).astype(np.int64)
+    over25 = ((gf + ga) >= 3).astype(np.int64)
+
+    return {
+        "used": np.bincount(team, minlength=n_teams),
+        "gf": np.bincount(team, weights=gf, minlength=n_teams),
+        "ga": np.bincount(team, weights=ga, minlength=n_teams),
+        "btts": np.bincount(team, weights=btts, minlength=n_teams),
+        "over25": np.bincount(team, weights=over25, minlength=n_teams),
+    }
+
+
+def run_builder_numpy(use_cache=True):
+    cols, total_csv, cache_hits = load_columns(use_cache)
+
+    home, away, hg, ag, date = cols.arrays()
+    sums = last_n_stats(home, away, hg, ag, date, len(cols.teams), LAST_N_MATCHES)
+
+    team_stats = {}
+    for tid, team in enumerate(cols.teams):
+        used = int(sums["used"][tid])
+        team_stats[team] = {
+            "matches_used": used,
+            "goals_for_avg": round(ratio(sums["gf"][tid], used), 3),
+            "goals_against_avg": round(ratio(sums["ga"][tid], used), 3),
+            "btts_rate": round(ratio(sums["btts"][tid], used), 3),
+            "over25_rate": round(ratio(sums["over25"][tid], used), 3)
+        }
+
+    write_output(team_stats)
+
+    print(
+        f"\n[HIST] DONE\n"
+        f"CSV files read   : {total_csv} ({cache_hits} from cache)\n"
+        f"Matches ingested : {len(hg)}\n"
+        f"Teams generated  : {len(team_stats)}\n"
+        f"Output           : {OUTPUT_FILE}\n"
+    )
 
-                match = {
-                    "home": home,
-                    "away": away,
-                    "homeGoals": hg,
-                    "awayGoals": ag
-                }
+# =========================
+# PYTHON ENGINE (STREAMING)
+# =========================
 
-                team_matches.setdefault(home, []).append(match)
-                team_matches.setdefault(away, []).append(match)
+def season_streams(rows, seq):
+    """
+    Per-team (day, seq, goals for, goals against) of one season, date
+    sorted, and the match count. seq is a running ingest counter that
+    orders same-day matches.
+    """
+    streams = {}
+    matches = 0
+
+    for r in rows:
+        try:
+            home = r["HomeTeam"].strip()
+            away = r["AwayTeam"].strip()
+            hg = int(r["FTHG"])
+            ag = int(r["FTAG"])
+        except Exception:
+            continue
+
+        matches += 1
+        key = (parse_date(r.get("Date", "")), next(seq))
+        streams.setdefault(home, []).append(key + (hg, ag))
+        streams.setdefault(away, []).append(key + (ag, hg))
+
+    for stream in streams.values():
+        stream.sort()
+    return streams, matches
+
+
+def run_builder():
+    # team -> its last LAST_N_MATCHES results by date, across every season
+    team_recent = {}
+    seq = count()
+    total_csv = 0
+    total_matches = 0
+
+    # ---------------------------------------------
+    # Traverse league folders, merge season streams
+    # ---------------------------------------------
+    for fpath in iter_csv_files():
+        total_csv += 1
+        streams, matches = season_streams(load_csv(fpath), seq)
+        total_matches += matches
+
+        for team, stream in streams.items():
+            # both sides already sorted; only the newest N can survive
+            team_recent[team] = deque(
+                heapq.merge(team_recent.get(team, ()), stream[-LAST_N_MATCHES:]),
+                maxlen=LAST_N_MATCHES
+            )
 
     # ---------------------------------------------
     # Build per-team stats
     # ---------------------------------------------
     team_stats = {}
 
-    for team, matches in team_matches.items():
-        recent = matches[-LAST_N_MATCHES:]
-
+    for team, recent in team_recent.items():
         goals_for = []
         goals_against = []
         btts = []
         over25 = []
 
-        for m in recent:
-            if m["home"] == team:
-                gf = m["homeGoals"]
-                ga = m["awayGoals"]
-            else:
-                gf = m["awayGoals"]
-                ga = m["homeGoals"]
-
+        for _, _, gf, ga in recent:
             goals_for.append(gf)
             goals_against.append(ga)
             btts.append(1 if gf > 0 and ga > 0 else 0)
@@ -146,4 +476,18 @@ def run_builder():
 # =========================
 
 if __name__ == "__main__":
-    run_builder()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--engine", choices=["numpy", "python"], default="numpy",
+        help="numpy: columnar vectorized build; python: per-team season streams heapq-merged by date"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="re-parse every CSV instead of using the parsed-season cache"
+    )
+    args = parser.parse_args()
+
+    if args.engine == "numpy":
+        run_builder_numpy(use_cache=not args.no_cache)
+    else:
+        run_builder()
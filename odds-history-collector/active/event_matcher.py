@@ -0,0 +1,73 @@
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+# =====================================================
+# CONFIG
+# =====================================================
+KICKOFF_TOLERANCE_SEC = 5 * 60
+
+# Same weights as the legacy all-pairs scorers (score_event / score_match)
+KICKOFF_WEIGHT = 0.5
+HOME_WEIGHT = 0.25
+AWAY_WEIGHT = 0.25
+
+# =====================================================
+# EVENT INDEX
+# =====================================================
+class EventIndex:
+    """
+    Fixture -> provider event matcher built once per league payload.
+
+    Events are bucketed by kickoff minute and hashed on their pre-normalized
+    (home, away) names, so a lookup probes the handful of minute buckets
+    inside the kickoff tolerance instead of scoring every event.
+
+    Only full matches (kickoff within tolerance and both names equal) score
+    at or above 0.95, so those are the only candidates the index returns.
+    Ties keep the earliest event in payload order, like the linear scan.
+    """
+
+    def __init__(
+        self,
+        events: List[Dict],
+        kickoff_of: Callable[[Dict], Optional[float]],
+        home_of: Callable[[Dict], str],
+        away_of: Callable[[Dict], str],
+        norm: Callable[[str], str],
+        tolerance_sec: int = KICKOFF_TOLERANCE_SEC,
+    ):
+        self.norm = norm
+        self.tolerance_sec = tolerance_sec
+        self._buckets: Dict[Tuple[int, Hashable, Hashable], List[Tuple[int, float, Dict]]] = {}
+
+        for pos, ev in enumerate(events):
+            try:
+                kick = kickoff_of(ev)
+            except Exception:
+                continue
+            if kick is None:
+                continue
+
+            key = (int(kick // 60), norm(home_of(ev) or ""), norm(away_of(ev) or ""))
+            self._buckets.setdefault(key, []).append((pos, kick, ev))
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self._buckets.values())
+
+    def best_match(self, kickoff_ts: float, home: str, away: str) -> Tuple[Optional[Dict], float]:
+        home_n = self.norm(home or "")
+        away_n = self.norm(away or "")
+
+        lo = int((kickoff_ts - self.tolerance_sec) // 60)
+        hi = int((kickoff_ts + self.tolerance_sec) // 60)
+
+        best = None
+        for minute in range(lo, hi + 1):
+            for pos, kick, ev in self._buckets.get((minute, home_n, away_n), ()):
+                if abs(kick - kickoff_ts) > self.tolerance_sec:
+                    continue
+                if best is None or pos < best[0]:
+                    best = (pos, ev)
+
+        if best is None:
+            return None, 0.0
+        return best[1], KICKOFF_WEIGHT + HOME_WEIGHT + AWAY_WEIGHT
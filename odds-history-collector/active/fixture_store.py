@@ -0,0 +1,292 @@
+import json
+import os
+import sqlite3
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from fixture_tree import date_files, league_dirs, load_fixture_file
+
+# =====================================================
+# CONFIG
+# =====================================================
+# lives next to the date files it indexes, so every stage that knows the
+# fixtures base finds the same store whatever its working directory
+STORE_NAME = "_fixtures.sqlite3"
+
+BUSY_TIMEOUT_SEC = 30
+
+# PRAGMA user_version; a store with another version is dropped and re-imported
+STORE_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS store_info (
+    key         TEXT PRIMARY KEY,
+    value       TEXT NOT NULL
+);
+
+-- one row per imported file, AUTOINCREMENT: a seq is never handed out twice
+CREATE TABLE IF NOT EXISTS imports (
+    seq         INTEGER PRIMARY KEY AUTOINCREMENT,
+    league      TEXT NOT NULL,
+    date_key    TEXT NOT NULL,
+    UNIQUE (league, date_key)
+);
+
+CREATE TABLE IF NOT EXISTS files (
+    league      TEXT NOT NULL,
+    date_key    TEXT NOT NULL,
+    mtime_ns    INTEGER NOT NULL,
+    size        INTEGER NOT NULL,
+    PRIMARY KEY (league, date_key)
+);
+
+CREATE TABLE IF NOT EXISTS fixtures (
+    league      TEXT NOT NULL,
+    date_key    TEXT NOT NULL,
+    pos         INTEGER NOT NULL,
+    fixture_id  TEXT,
+    kickoff_ts  REAL,
+    home        TEXT,
+    away        TEXT,
+    home_id     TEXT,
+    away_id     TEXT,
+    home_goals  INTEGER,
+    away_goals  INTEGER,
+    status      TEXT,
+    raw         TEXT NOT NULL,
+    updated_at  TEXT NOT NULL,
+    import_seq  INTEGER NOT NULL,
+    PRIMARY KEY (league, date_key, pos)
+);
+
+CREATE INDEX IF NOT EXISTS ix_fixtures_id ON fixtures (fixture_id);
+CREATE INDEX IF NOT EXISTS ix_fixtures_league_kickoff ON fixtures (league, kickoff_ts);
+CREATE INDEX IF NOT EXISTS ix_fixtures_home_id ON fixtures (home_id);
+CREATE INDEX IF NOT EXISTS ix_fixtures_away_id ON fixtures (away_id);
+CREATE INDEX IF NOT EXISTS ix_fixtures_import_seq ON fixtures (import_seq);
+"""
+
+OLD_TABLES = ("fixtures", "files", "imports", "store_info")
+
+# source order of the tree walk (league dir, date file, position in file)
+TREE_ORDER = "ORDER BY league, date_key, pos"
+
+# =====================================================
+# HELPERS
+# =====================================================
+def store_path(base: str) -> str:
+    return os.path.join(base, STORE_NAME)
+
+def _num(val) -> Optional[float]:
+    return val if isinstance(val, (int, float)) and not isinstance(val, bool) else None
+
+def _int(val) -> Optional[int]:
+    return int(val) if isinstance(val, int) else None
+
+def _text(val) -> Optional[str]:
+    return str(val) if val else None
+
+def fixture_row(league: str, date_key: str, pos: int, fx: Dict, now: str, seq: int) -> Tuple:
+    return (
+        league,
+        date_key,
+        pos,
+        _text(fx.get("fixture_id")),
+        _num(fx.get("kickoff_ts")),
+        fx.get("home"),
+        fx.get("away"),
+        _text(fx.get("homeId")),
+        _text(fx.get("awayId")),
+        _int(fx.get("homeGoals")),
+        _int(fx.get("awayGoals")),
+        fx.get("status"),
+        json.dumps(fx, ensure_ascii=False, separators=(",", ":")),
+        now,
+        seq,
+    )
+
+# =====================================================
+# STORE
+# =====================================================
+class FixtureStore:
+    """
+    SQLite index over a fixtures/v1 tree (WAL: readers never block the writer).
+
+    The date files stay the source of truth. sync() re-imports only the files
+    whose (mtime, size) changed, so calling it before a read costs one stat
+    per date file; the registry calls it after every refresh.
+
+    Every file import takes the next import_seq inside its write transaction.
+    SQLite runs one writer at a time, so seqs are committed in order and
+    (store_id, last_import_seq()) is a watermark no later commit can fall
+    behind.
+    """
+
+    def __init__(self, base: str):
+        self.base = base
+        self.conn = sqlite3.connect(store_path(base), timeout=BUSY_TIMEOUT_SEC)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self.store_id = self.conn.execute(
+            "SELECT value FROM store_info WHERE key = 'store_id'"
+        ).fetchone()[0]
+
+    def _migrate(self):
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] == STORE_VERSION:
+            return
+
+        with self.conn:
+            # write lock first: a concurrent opener waits, then sees the new version
+            self.conn.execute("BEGIN IMMEDIATE")
+            if self.conn.execute("PRAGMA user_version").fetchone()[0] == STORE_VERSION:
+                return
+            # derived data: an older layout is dropped and re-imported by sync()
+            for table in OLD_TABLES:
+                self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+            for stmt in SCHEMA.split(";"):
+                if stmt.strip():
+                    self.conn.execute(stmt)
+            # a new id tells watermark holders that seqs started over
+            self.conn.execute(
+                "INSERT INTO store_info VALUES ('store_id', ?)", (uuid.uuid4().hex,)
+            )
+            self.conn.execute(f"PRAGMA user_version = {STORE_VERSION}")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- writes ----------
+    def replace_file(self, league: str, date_key: str, fixtures: List, st: os.stat_result):
+        now = datetime.now(timezone.utc).isoformat()
+        with self.conn:
+            # the DELETE takes the write lock, so the seq below is assigned in commit order
+            self.conn.execute(
+                "DELETE FROM fixtures WHERE league = ? AND date_key = ?", (league, date_key)
+            )
+            seq = self.conn.execute(
+                "INSERT OR REPLACE INTO imports (league, date_key) VALUES (?, ?)",
+                (league, date_key),
+            ).lastrowid
+            rows = [
+                fixture_row(league, date_key, pos, fx, now, seq)
+                for pos, fx in enumerate(fixtures)
+                if isinstance(fx, dict)
+            ]
+            self.conn.executemany(
+                f"INSERT INTO fixtures VALUES ({', '.join('?' * 15)})", rows
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                (league, date_key, st.st_mtime_ns, st.st_size),
+            )
+
+    def remove_file(self, league: str, date_key: str):
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM fixtures WHERE league = ? AND date_key = ?", (league, date_key)
+            )
+            self.conn.execute(
+                "DELETE FROM files WHERE league = ? AND date_key = ?", (league, date_key)
+            )
+            self.conn.execute(
+                "DELETE FROM imports WHERE league = ? AND date_key = ?", (league, date_key)
+            )
+
+    def sync(self) -> int:
+        """Bring the index in line with the tree; returns files re-imported."""
+        known = {
+            (league, date_key): (mtime_ns, size)
+            for league, date_key, mtime_ns, size in self.conn.execute("SELECT * FROM files")
+        }
+
+        imported = 0
+        present = set()
+        if os.path.isdir(self.base):
+            for league, league_path in league_dirs(self.base):
+                for date_key, path in date_files(league_path):
+                    present.add((league, date_key))
+                    st = os.stat(path)
+                    if known.get((league, date_key)) == (st.st_mtime_ns, st.st_size):
+                        continue
+
+                    try:
+                        data = load_fixture_file(path)
+                    except (OSError, ValueError):
+                        continue
+                    self.replace_file(league, date_key, data or [], st)
+                    imported += 1
+
+        for league, date_key in known.keys() - present:
+            self.remove_file(league, date_key)
+
+        return imported
+
+    # ---------- queries ----------
+    def _select(self, where: str = "", params: Iterable = ()) -> Iterator[Tuple[str, Dict]]:
+        sql = f"SELECT league, raw FROM fixtures {where} {TREE_ORDER}"
+        for league, raw in self.conn.execute(sql, tuple(params)):
+            yield league, json.loads(raw)
+
+    def by_id(self, fixture_id: str) -> Optional[Tuple[str, Dict]]:
+        return next(self._select("WHERE fixture_id = ?", (str(fixture_id),)), None)
+
+    def in_window(
+        self,
+        leagues: Optional[Iterable[str]] = None,
+        start_ts: Optional[float] = None,
+        end_ts: Optional[float] = None,
+    ) -> Iterator[Tuple[str, Dict]]:
+        """(league, fixture) with a numeric kickoff_ts inside [start_ts, end_ts]."""
+        clauses = ["kickoff_ts IS NOT NULL"]
+        params: List = []
+        if leagues is not None:
+            leagues = sorted(leagues)
+            clauses.append(f"league IN ({', '.join('?' * len(leagues))})")
+            params.extend(leagues)
+        if start_ts is not None:
+            clauses.append("kickoff_ts >= ?")
+            params.append(start_ts)
+        if end_ts is not None:
+            clauses.append("kickoff_ts <= ?")
+            params.append(end_ts)
+        return self._select("WHERE " + " AND ".join(clauses), params)
+
+    def by_team(self, team_id: str) -> Iterator[Tuple[str, Dict]]:
+        return self._select("WHERE home_id = ? OR away_id = ?", (str(team_id), str(team_id)))
+
+    def finished_with_teams(
+        self,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+    ) -> Iterator[Tuple[str, Dict]]:
+        """Fixtures with both team ids and a final score, import_seq in (since, until]."""
+        clauses = [
+            "home_id IS NOT NULL AND away_id IS NOT NULL",
+            "home_goals IS NOT NULL AND away_goals IS NOT NULL",
+        ]
+        params: List = []
+        if since is not None:
+            clauses.append("import_seq > ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("import_seq <= ?")
+            params.append(until)
+        return self._select("WHERE " + " AND ".join(clauses), params)
+
+    def last_import_seq(self) -> int:
+        """import_seq of the latest committed import (0 when empty), a watermark for readers."""
+        return self.conn.execute("SELECT COALESCE(MAX(import_seq), 0) FROM fixtures").fetchone()[0]
+
+def open_store(base: str) -> FixtureStore:
+    """Open the store for a fixtures base, synced with the tree."""
+    store = FixtureStore(base)
+    store.sync()
+    return store
@@ -0,0 +1,65 @@
+import json
+import os
+from datetime import date
+from typing import List, Optional, Tuple
+
+# =====================================================
+# CONFIG
+# =====================================================
+# date= is the scoreboard day the registry queried, not the UTC kickoff day,
+# so a kickoff can sit in the neighbouring file
+DATE_PAD_DAYS = 1
+
+# =====================================================
+# HELPERS
+# =====================================================
+def parse_file_date(fname: str) -> Optional[date]:
+    # date=YYYY-MM-DD.json
+    try:
+        return date.fromisoformat(fname[len("date="):-len(".json")])
+    except ValueError:
+        return None
+
+def is_date_file(fname: str) -> bool:
+    return fname.startswith("date=") and fname.endswith(".json")
+
+def load_fixture_file(path: str) -> Optional[list]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data if isinstance(data, list) else None
+
+# =====================================================
+# TREE WALK (FILENAME-PRUNED)
+# =====================================================
+def league_dirs(base: str) -> List[Tuple[str, str]]:
+    out = []
+    for league_dir in sorted(os.listdir(base)):
+        if not league_dir.startswith("league="):
+            continue
+        path = os.path.join(base, league_dir)
+        if os.path.isdir(path):
+            out.append((league_dir.split("=", 1)[1], path))
+    return out
+
+def date_files(
+    league_path: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+) -> List[Tuple[str, str]]:
+    """(date key, path) for every date file whose name falls inside [start, end]."""
+    out = []
+    for fname in sorted(os.listdir(league_path)):
+        if not is_date_file(fname):
+            continue
+
+        if start or end:
+            day = parse_file_date(fname)
+            if day is None:
+                continue
+            if start and day < start:
+                continue
+            if end and day > end:
+                continue
+
+        out.append((fname[len("date="):-len(".json")], os.path.join(league_path, fname)))
+    return out
@@ -1,12 +1,21 @@
 import os
 import json
+import time
+import hashlib
+import random
+import argparse
 import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, timezone
 
+from fixture_store import FixtureStore
+from http_cache import cached_get, get_session
+
 # -----------------------------
 # CONFIG
 # -----------------------------
 ROOT_DIR = "./fixtures/v1"
+STATE_FILE = os.path.join(ROOT_DIR, "_registry_state.json")
 SCHEMA_VERSION = "fixture_registry_v1"
 SOURCE = "espn"
 
@@ -27,6 +36,10 @@ LEAGUES = {
     "GRE1": {
         "name": "Super League 1",
         "espn_code": "gre.1"
+    },
+    "ITA1": {
+        "name": "Serie A",
+        "espn_code": "ita.1"
     }
 }
 
@@ -36,6 +49,20 @@ DAYS_FORWARD = 7
 
 ESPN_SCOREBOARD = "https://site.api.espn.com/apis/site/v2/sports/soccer/{league}/scoreboard"
 
+# Response cache TTLs: a day fetched after it ended rarely changes; a copy
+# taken while it was still live (or a today/future day) does
+CACHE_TTL_PAST_SEC = 24 * 60 * 60
+CACHE_TTL_LIVE_SEC = 10 * 60
+
+# Concurrent fetching: bounded workers over http_cache's pooled session
+FETCH_WORKERS = 8
+FETCH_TIMEOUT_SEC = 30
+
+# Per-request retry with full-jitter exponential backoff
+FETCH_ATTEMPTS = 3
+RETRY_BASE_SEC = 1.0
+RETRY_MAX_SEC = 8.0
+
 # -----------------------------
 # HELPERS
 # -----------------------------
@@ -68,57 +95,200 @@ def safe_team(ev, side):
         pass
     return ""
 
-def fetch_day(league_code, day):
+def is_retryable(exc):
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        code = exc.response.status_code
+        return code == 429 or code >= 500
+    return isinstance(exc, (requests.RequestException, ValueError))
+
+def scoreboard_fresh(day):
+    """Cache freshness for one day: the long TTL only for copies fetched after the day ended."""
+    day_end = (datetime(day.year, day.month, day.day, tzinfo=timezone.utc) + timedelta(days=1)).timestamp()
+
+    def fresh(entry):
+        fetched_at = entry.get("fetched_at", 0)
+        ttl = CACHE_TTL_PAST_SEC if fetched_at >= day_end else CACHE_TTL_LIVE_SEC
+        return time.time() - fetched_at < ttl
+
+    return fresh
+
+def fetch_day(league_code, day, refetch=False):
     url = ESPN_SCOREBOARD.format(league=league_code)
     params = {"dates": day.strftime("%Y%m%d")}
-    r = requests.get(url, params=params, timeout=30)
-    r.raise_for_status()
-    return r.json()
+    fresh = None if refetch else scoreboard_fresh(day)
+
+    for attempt in range(FETCH_ATTEMPTS):
+        try:
+            return cached_get(
+                url, params, ttl_sec=0, fresh=fresh,
+                session=get_session(), timeout=FETCH_TIMEOUT_SEC
+            )
+        except Exception as e:
+            if attempt == FETCH_ATTEMPTS - 1 or not is_retryable(e):
+                raise
+            time.sleep(random.uniform(0, min(RETRY_MAX_SEC, RETRY_BASE_SEC * 2 ** attempt)))
+
+def build_records(league_id, meta, day, payload):
+    records = []
+    for ev in payload.get("events", []):
+        try:
+            kickoff_ts = int(
+                datetime.fromisoformat(
+                    ev["date"].replace("Z", "+00:00")
+                ).timestamp()
+            )
+        except Exception:
+            continue
+
+        rec = {
+            "schema_version": SCHEMA_VERSION,
+            "fixture_id": str(ev.get("id")),
+            "league_id": league_id,
+            "league_name": meta["name"],
+            "home": safe_team(ev, "home"),
+            "away": safe_team(ev, "away"),
+            "kickoff_ts": kickoff_ts,
+            "date": day.isoformat(),
+            "status": parse_status(ev),
+            "source": SOURCE
+        }
+        records.append(rec)
+    return records
+
+def day_file(league_id, day):
+    return os.path.join(ROOT_DIR, f"league={league_id}", f"date={day.isoformat()}.json")
+
+def state_key(league_id, day):
+    return f"{league_id}/{day.isoformat()}"
+
+def content_hash(raw):
+    return hashlib.sha1(raw).hexdigest()
+
+def file_hash(path):
+    try:
+        with open(path, "rb") as f:
+            return content_hash(f.read())
+    except OSError:
+        return None
+
+def is_frozen(records):
+    # every fixture finished: the scoreboard for this day will not change again
+    return bool(records) and all(r["status"] == "FINISHED" for r in records)
+
+def write_day(path, raw):
+    ensure_dir(os.path.dirname(path))
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(raw)
+    os.replace(tmp, path)
+
+def refresh_day(league_id, meta, day, entry, refetch=False):
+    """Fetch one scoreboard day; returns (fixture count, state entry, outcome)."""
+    path = day_file(league_id, day)
+    if entry and entry.get("frozen") and os.path.exists(path):
+        return entry.get("fixtures", 0), entry, "frozen"
+
+    payload = fetch_day(meta["espn_code"], day, refetch)
+    records = build_records(league_id, meta, day, payload)
+    raw = json.dumps(records, ensure_ascii=False, indent=2).encode("utf-8")
+    digest = content_hash(raw)
+
+    # unchanged content keeps the file (and its mtime) untouched
+    known = entry.get("hash") if entry else None
+    if (digest == known and os.path.exists(path)) or digest == file_hash(path):
+        outcome = "unchanged"
+    else:
+        write_day(path, raw)
+        outcome = "written"
+
+    new_entry = {
+        "hash": digest,
+        "frozen": is_frozen(records),
+        "fixtures": len(records),
+        "fetched_at": datetime.now(timezone.utc).isoformat(),
+    }
+    return len(records), new_entry, outcome
+
+def load_state():
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(state):
+    ensure_dir(ROOT_DIR)
+    tmp = STATE_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp, STATE_FILE)
 
 # -----------------------------
 # MAIN
 # -----------------------------
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--workers", type=int, default=FETCH_WORKERS,
+        help="fetch N scoreboard pages concurrently (1 = sequential)"
+    )
+    parser.add_argument(
+        "--full", action="store_true",
+        help="ignore the registry state and the response cache; refetch every day"
+    )
+    args = parser.parse_args()
+
     today = datetime.now(timezone.utc).date()
     start = today - timedelta(days=DAYS_BACK)
     end = today + timedelta(days=DAYS_FORWARD)
 
-    for league_id, meta in LEAGUES.items():
-        out_dir = os.path.join(ROOT_DIR, f"league={league_id}")
-        ensure_dir(out_dir)
-
-        for day in date_range(start, end):
-            payload = fetch_day(meta["espn_code"], day)
-            events = payload.get("events", [])
-
-            records = []
-            for ev in events:
-                try:
-                    kickoff_ts = int(
-                        datetime.fromisoformat(
-                            ev["date"].replace("Z", "+00:00")
-                        ).timestamp()
-                    )
-                except Exception:
-                    continue
-
-                rec = {
-                    "schema_version": SCHEMA_VERSION,
-                    "fixture_id": str(ev.get("id")),
-                    "league_id": league_id,
-                    "league_name": meta["name"],
-                    "home": safe_team(ev, "home"),
-                    "away": safe_team(ev, "away"),
-                    "kickoff_ts": kickoff_ts,
-                    "date": day.isoformat(),
-                    "status": parse_status(ev),
-                    "source": SOURCE
-                }
-                records.append(rec)
-
-            out_file = os.path.join(out_dir, f"date={day.isoformat()}.json")
-            with open(out_file, "w", encoding="utf-8") as f:
-                json.dump(records, f, ensure_ascii=False, indent=2)
+    tasks = [
+        (league_id, meta, day)
+        for league_id, meta in LEAGUES.items()
+        for day in date_range(start, end)
+    ]
+
+    # days that left the window are never refreshed again
+    state = {} if args.full else {
+        k: v for k, v in load_state().items()
+        if k.split("/", 1)[1] >= start.isoformat()
+    }
+
+    fixtures = 0
+    outcomes = {"written": 0, "unchanged": 0, "frozen": 0}
+    failures = []
+    # a failed (league, day) keeps its previous file and does not stop the rest
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {
+            pool.submit(
+                refresh_day, *task, state.get(state_key(task[0], task[2])), args.full
+            ): task
+            for task in tasks
+        }
+        for fut in as_completed(futures):
+            league_id, _, day = futures[fut]
+            try:
+                count, entry, outcome = fut.result()
+            except Exception as e:
+                failures.append((league_id, day, e))
+                continue
+            fixtures += count
+            outcomes[outcome] += 1
+            state[state_key(league_id, day)] = entry
+
+    save_state(state)
+
+    # keep the indexed fixture store in step with the files just written
+    with FixtureStore(ROOT_DIR) as store:
+        indexed = store.sync()
+
+    print(
+        f"Scoreboards: {len(tasks) - len(failures)}/{len(tasks)} ok | "
+        f"written: {outcomes['written']} | unchanged: {outcomes['unchanged']} | "
+        f"frozen: {outcomes['frozen']} | fixtures: {fixtures} | indexed: {indexed}"
+    )
+    for league_id, day, e in sorted(failures, key=lambda f: (f[0], f[1])):
+        print(f"[{league_id} {day.isoformat()}] fetch failed: {e}")
 
 if __name__ == "__main__":
     main()
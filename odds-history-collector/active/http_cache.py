@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlencode
+
+# =====================================================
+# CONFIG
+# =====================================================
+CACHE_DIR = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cache", "http")
+)
+
+DEFAULT_TTL_SEC = 10 * 60
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+# never part of the cache key (and never written to disk)
+SECRET_PARAMS = {"apiKey"}
+
+# one keep-alive pool per process, sized for the concurrent fetch workers
+HTTP_POOL_SIZE = 16
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+
+# =====================================================
+# HELPERS
+# =====================================================
+def ensure_dir(path: str):
+    os.makedirs(path, exist_ok=True)
+
+def public_params(params: Optional[Dict]) -> Dict:
+    return {k: v for k, v in (params or {}).items() if k not in SECRET_PARAMS}
+
+def cache_key(url: str, params: Optional[Dict] = None) -> str:
+    query = urlencode(sorted(public_params(params).items()))
+    return hashlib.sha1(f"{url}?{query}".encode("utf-8")).hexdigest()
+
+def entry_path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f"{key}.json")
+
+def read_entry(path: str) -> Optional[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_entry(path: str, entry: Dict):
+    ensure_dir(CACHE_DIR)
+    fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def touch(path: str):
+    # mtime doubles as the LRU clock
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+# =====================================================
+# POOLED SESSION
+# =====================================================
+def get_session() -> requests.Session:
+    """Process-wide pooled session shared by every fetcher's worker threads."""
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE
+            )
+            session.mount("https://", adapter)
+            _SESSION = session
+    return _SESSION
+
+# =====================================================
+# EVICTION (LRU, SIZE-BOUNDED)
+# =====================================================
+def evict(max_bytes: int = MAX_CACHE_BYTES):
+    if not os.path.isdir(CACHE_DIR):
+        return
+
+    entries = []
+    total = 0
+    for de in os.scandir(CACHE_DIR):
+        if not de.name.endswith(".json"):
+            continue
+        try:
+            st = de.stat()
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, de.path))
+        total += st.st_size
+
+    if total <= max_bytes:
+        return
+
+    entries.sort()
+    for _, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+
+# =====================================================
+# CACHED GET
+# =====================================================
+def cached_get(
+    url: str,
+    params: Optional[Dict] = None,
+    ttl_sec: int = DEFAULT_TTL_SEC,
+    session: Optional[requests.Session] = None,
+    timeout: int = 20,
+    headers: Optional[Dict] = None,
+    fresh: Optional[Callable[[Dict], bool]] = None,
+    before_request: Optional[Callable[[], None]] = None,
+    on_response: Optional[Callable[[requests.Response], None]] = None,
+) -> Any:
+    """
+    GET a JSON body through the on-disk cache.
+
+    fresh, when given, decides from the cached entry (its fetched_at) whether
+    it can be served, instead of ttl_sec. before_request / on_response only run when a request actually goes
+    out (pacing and quota accounting).
+    """
+    path = entry_path(cache_key(url, params))
+    entry = read_entry(path)
+    now = time.time()
+
+    if entry:
+        if fresh is not None:
+            hit = fresh(entry)
+        else:
+            hit = now - entry.get("fetched_at", 0) < ttl_sec
+        if hit:
+            touch(path)
+            return entry["body"]
+
+    req_headers = dict(headers or {})
+    if entry:
+        if entry.get("etag"):
+            req_headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            req_headers["If-Modified-Since"] = entry["last_modified"]
+
+    if before_request:
+        before_request()
+
+    r = (session or requests).get(url, params=params, headers=req_headers, timeout=timeout)
+
+    if on_response:
+        on_response(r)
+
+    if r.status_code == 304 and entry:
+        entry["fetched_at"] = now
+        write_entry(path, entry)
+        return entry["body"]
+
+    r.raise_for_status()
+    body = r.json()
+
+    write_entry(path, {
+        "url": url,
+        "params": public_params(params),
+        "fetched_at": now,
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+        "body": body,
+    })
+    evict()
+    return body
@@ -1,9 +1,18 @@
+import argparse
+import hashlib
 import json
+import math
 import os
 import time
-import requests
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+
+from event_matcher import EventIndex
+from fixture_store import open_store
+from http_cache import cached_get, get_session
+from quota_budget import IMMINENT_SEC, QuotaBudget, TokenBucket
+from snapshot_log import LAYOUT_FILES, LAYOUT_LOG, META_NAME, append_snapshot
 
 # =====================================================
 # CONFIG
@@ -13,16 +22,34 @@ DEBUG_WIDE_WINDOW = False
 FIXTURES_BASE = os.path.join("fixtures", "v1")
 ODDS_BASE = os.path.join("odds", "v2")
 
-LEAGUES_ALLOWED = {"ENG1", "ESP1", "FRA1", "GRE1"}
+# "files" (snapshot_<ts>.json per poll) or "log" (append-only per-fixture log)
+SNAPSHOT_LAYOUT = os.getenv("ODDS_SNAPSHOT_LAYOUT", LAYOUT_FILES)
+
+LEAGUES_ALLOWED = {"ENG1", "ESP1", "FRA1", "GRE1", "ITA1"}
 
 NOW = datetime.now(timezone.utc)
 
-if DEBUG_WIDE_WINDOW:
-    WINDOW_PAST = NOW - timedelta(days=3)
-    WINDOW_FUTURE = NOW + timedelta(days=7)
-else:
-    WINDOW_PAST = NOW - timedelta(hours=12)
-    WINDOW_FUTURE = NOW + timedelta(hours=36)
+def collection_window(now: datetime):
+    if DEBUG_WIDE_WINDOW:
+        return now - timedelta(days=3), now + timedelta(days=7)
+    return now - timedelta(hours=12), now + timedelta(hours=36)
+
+WINDOW_PAST, WINDOW_FUTURE = collection_window(NOW)
+
+# =====================================================
+# DAEMON CONFIG
+# =====================================================
+# (max seconds to nearest kickoff, poll interval seconds) - first match wins.
+# Leagues with nothing inside the last bucket, or only past kickoffs, are idle.
+POLL_CADENCE = [
+    (60 * 60, 5 * 60),
+    (6 * 60 * 60, 15 * 60),
+    (12 * 60 * 60, 30 * 60),
+    (36 * 60 * 60, 60 * 60),
+]
+FIXTURE_RELOAD_SEC = 30 * 60
+DAEMON_MIN_SLEEP_SEC = 5
+DAEMON_MAX_SLEEP_SEC = 15 * 60
 
 # =====================================================
 # ODDS API CONFIG
@@ -34,20 +61,42 @@ if not ODDS_API_KEY:
 ODDS_API_BASE = "https://api.the-odds-api.com/v4/sports"
 REGIONS = "eu"
 MARKETS = "h2h,totals"
-BOOKMAKERS = "betfair,unibet"
+# One request per sport key carries the union of every bookmaker set, and
+# each fixture gets a single odds_snapshot_provider_v1 snapshot with all books.
+BOOKMAKER_SETS = {
+    "core": ["betfair", "unibet"],
+    "asians": ["pinnacle", "sbobet", "bet188"],
+}
+BOOKMAKERS = ",".join(bm for books in BOOKMAKER_SETS.values() for bm in books)
+BOOKMAKER_KEYS = set(BOOKMAKERS.split(","))
 ODDS_FORMAT = "decimal"
 DATE_FORMAT = "iso"
 
+# quota credits charged per odds request: markets x regions
+REQUEST_COST = len(MARKETS.split(",")) * len(REGIONS.split(","))
+
 SPORT_KEYS = {
     "ENG1": "soccer_epl",
     "ESP1": "soccer_spain_la_liga",
     "FRA1": "soccer_france_ligue_one",
     "GRE1": "soccer_greece_super_league",
+    "ITA1": "soccer_italy_serie_a",
 }
 
-CACHE_TTL_SEC = 50 * 60
-_LEAGUE_CACHE: Dict[str, List[Dict]] = {}
-_LEAGUE_CACHE_AT: Dict[str, float] = {}
+# Odds bodies are never served from the http_cache TTL: a snapshot is
+# stamped with the collection time, so every poll goes to the provider.
+# The cached ETag / Last-Modified still turn an unchanged list into a 304.
+ODDS_CACHE_TTL_SEC = 0
+
+# Concurrent fetch stage: workers share http_cache's pooled session
+FETCH_WORKERS = 8
+
+# Quota budget (persistent) and request pacing shared by all fetch workers
+PACER = TokenBucket()
+_BUDGET: Optional[QuotaBudget] = None
+
+# Last written markets hash per "league/fixture" (mirrored in meta.json)
+_LAST_MARKETS_HASH: Dict[str, str] = {}
 
 # =====================================================
 # HELPERS
@@ -55,6 +104,10 @@ _LEAGUE_CACHE_AT: Dict[str, float] = {}
 def ensure_dir(path: str):
     os.makedirs(path, exist_ok=True)
 
+def markets_hash(markets: Dict) -> str:
+    blob = json.dumps(markets, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
 def ts_for_filename(dt: datetime):
     return dt.strftime("%Y-%m-%dT%H-%M-%SZ")
 
@@ -64,60 +117,35 @@ def norm(s: str) -> str:
 # =====================================================
 # FIXTURE LOADER
 # =====================================================
-def load_fixtures() -> Dict[str, Dict]:
+def load_fixtures(now: Optional[datetime] = None) -> Dict[str, Dict]:
+    window_past, window_future = collection_window(now) if now else (WINDOW_PAST, WINDOW_FUTURE)
     fixtures: Dict[str, Dict] = {}
 
-    for league_dir in os.listdir(FIXTURES_BASE):
-        if not league_dir.startswith("league="):
-            continue
-
-        league = league_dir.split("=", 1)[1]
-        if league not in LEAGUES_ALLOWED:
-            continue
-
-        league_path = os.path.join(FIXTURES_BASE, league_dir)
-
-        for fname in os.listdir(league_path):
-            if not (fname.startswith("date=") and fname.endswith(".json")):
+    # indexed (league, kickoff_ts) range query on the fixture store
+    with open_store(FIXTURES_BASE) as store:
+        for league, fx in store.in_window(
+            LEAGUES_ALLOWED, window_past.timestamp(), window_future.timestamp()
+        ):
+            fid = fx.get("fixture_id")
+            if not fid or fid in fixtures:
                 continue
 
-            with open(os.path.join(league_path, fname), "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            if not isinstance(data, list):
-                continue
-
-            for fx in data:
-                fid = fx.get("fixture_id")
-                ts = fx.get("kickoff_ts")
-
-                if not fid or not isinstance(ts, (int, float)):
-                    continue
-
-                kickoff = datetime.fromtimestamp(ts, tz=timezone.utc)
-                if kickoff < WINDOW_PAST or kickoff > WINDOW_FUTURE:
-                    continue
-
-                if fid not in fixtures:
-                    fx_copy = dict(fx)
-                    fx_copy["league"] = league
-                    fx_copy["_kickoff_dt"] = kickoff
-                    fixtures[fid] = fx_copy
+            fx["league"] = league
+            fx["_kickoff_dt"] = datetime.fromtimestamp(fx["kickoff_ts"], tz=timezone.utc)
+            fixtures[fid] = fx
 
     return fixtures
 
 # =====================================================
-# ODDS API FETCH (CACHED)
+# ODDS API FETCH (CACHED, POOLED)
 # =====================================================
-def get_league_events(league: str) -> List[Dict]:
-    now = time.time()
-    if league in _LEAGUE_CACHE and (now - _LEAGUE_CACHE_AT.get(league, 0)) < CACHE_TTL_SEC:
-        return _LEAGUE_CACHE[league]
-
-    sport_key = SPORT_KEYS.get(league)
-    if not sport_key:
-        return []
+def get_budget() -> QuotaBudget:
+    global _BUDGET
+    if _BUDGET is None:
+        _BUDGET = QuotaBudget()
+    return _BUDGET
 
+def sport_request(sport_key: str):
     url = f"{ODDS_API_BASE}/{sport_key}/odds"
     params = {
         "apiKey": ODDS_API_KEY,
@@ -127,55 +155,120 @@ def get_league_events(league: str) -> List[Dict]:
         "oddsFormat": ODDS_FORMAT,
         "dateFormat": DATE_FORMAT,
     }
+    return url, params
 
-    r = requests.get(url, params=params, timeout=20)
-    r.raise_for_status()
-    data = r.json()
+def get_sport_events(sport_key: str) -> List[Dict]:
+    url, params = sport_request(sport_key)
+    data = cached_get(
+        url, params, ttl_sec=ODDS_CACHE_TTL_SEC, session=get_session(), timeout=20,
+        before_request=PACER.acquire,
+        on_response=lambda r: get_budget().record(r.headers),
+    )
+    return data or []
 
-    _LEAGUE_CACHE[league] = data
-    _LEAGUE_CACHE_AT[league] = now
-    return data
+# =====================================================
+# FETCH STAGE
+# =====================================================
+def required_sport_keys(fixtures: Dict[str, Dict]) -> List[str]:
+    return sorted({
+        SPORT_KEYS[fx["league"]]
+        for fx in fixtures.values()
+        if fx.get("league") in SPORT_KEYS
+    })
+
+def nearest_kickoffs(fixtures: Dict[str, Dict], now: datetime) -> Dict[str, float]:
+    """Seconds to the nearest upcoming kickoff per sport key."""
+    nearest: Dict[str, float] = {}
+    for fx in fixtures.values():
+        sport_key = SPORT_KEYS.get(fx["league"])
+        if not sport_key:
+            continue
+        secs = (fx["_kickoff_dt"] - now).total_seconds()
+        if secs <= 0:
+            continue
+        if sport_key not in nearest or secs < nearest[sport_key]:
+            nearest[sport_key] = secs
+    return nearest
+
+def plan_fetches(sport_keys: List[str], nearest: Dict[str, float]) -> Dict[str, bool]:
+    """Spend the credit budget nearest kickoff first; False means not fetched."""
+    budget = get_budget()
+    plan: Dict[str, bool] = {}
+
+    for sport_key in sorted(sport_keys, key=lambda sk: nearest.get(sk, math.inf)):
+        imminent = nearest.get(sport_key, math.inf) <= IMMINENT_SEC
+        plan[sport_key] = budget.try_spend(imminent, REQUEST_COST)
+        if not plan[sport_key]:
+            # cached odds are old prices: no snapshot beats a stale one
+            print(f"[{sport_key}] request budget exhausted - skipped this cycle")
+
+    return plan
+
+def fetch_all_sport_events(
+    sport_keys: List[str],
+    nearest: Optional[Dict[str, float]] = None,
+) -> Tuple[Dict[str, List[Dict]], List[str]]:
+    """Events per fetched sport key, and the keys that failed; over-budget keys are in neither."""
+    results: Dict[str, List[Dict]] = {}
+    failed: List[str] = []
+    if not sport_keys:
+        return results, failed
+
+    plan = plan_fetches(sport_keys, nearest or {})
+    allowed = [sk for sk in sport_keys if plan[sk]]
+    if not allowed:
+        return results, failed
+
+    workers = min(FETCH_WORKERS, len(allowed))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(get_sport_events, sk): sk
+            for sk in allowed
+        }
+        for fut in as_completed(futures):
+            sport_key = futures[fut]
+            try:
+                results[sport_key] = fut.result()
+            except Exception as e:
+                print(f"[{sport_key}] odds fetch failed: {e}")
+                failed.append(sport_key)
+
+    return results, sorted(failed)
 
 # =====================================================
-# MATCH SCORING
+# MATCH INDEX
 # =====================================================
-def score_event(fx: Dict, ev: Dict) -> float:
-    score = 0.0
+def event_kickoff_ts(ev: Dict) -> Optional[float]:
     ct = ev.get("commence_time")
     if not ct:
-        return 0.0
-
-    try:
-        ev_kick = datetime.fromisoformat(ct.replace("Z", "+00:00"))
-        if abs((ev_kick - fx["_kickoff_dt"]).total_seconds()) <= 300:
-            score += 0.5
-    except Exception:
-        return 0.0
-
-    if norm(ev.get("home_team", "")) == norm(fx.get("home", "")):
-        score += 0.25
-    if norm(ev.get("away_team", "")) == norm(fx.get("away", "")):
-        score += 0.25
-
-    return score
+        return None
+    return datetime.fromisoformat(ct.replace("Z", "+00:00")).timestamp()
+
+def build_event_index(events: List[Dict]) -> EventIndex:
+    return EventIndex(
+        events,
+        kickoff_of=event_kickoff_ts,
+        home_of=lambda ev: ev.get("home_team", ""),
+        away_of=lambda ev: ev.get("away_team", ""),
+        norm=norm,
+    )
 
 # =====================================================
 # PROVIDER ADAPTER
 # =====================================================
-def fetch_odds_provider(fixture: Dict) -> Dict:
+def fetch_odds_provider(fixture: Dict, index: EventIndex, now: Optional[datetime] = None) -> Dict:
     league = fixture.get("league")
     if league not in SPORT_KEYS:
         return {}
 
-    events = get_league_events(league)
-    if not events:
+    if not index:
         return {}
 
-    best, best_score = None, 0.0
-    for ev in events:
-        s = score_event(fixture, ev)
-        if s > best_score:
-            best, best_score = ev, s
+    best, best_score = index.best_match(
+        fixture["_kickoff_dt"].timestamp(),
+        fixture.get("home", ""),
+        fixture.get("away", ""),
+    )
 
     if not best or best_score < 0.95:
         return {}
@@ -184,7 +277,7 @@ def fetch_odds_provider(fixture: Dict) -> Dict:
 
     for bm in best.get("bookmakers", []):
         bm_key = bm.get("key")
-        if bm_key not in BOOKMAKERS.split(","):
+        if bm_key not in BOOKMAKER_KEYS:
             continue
 
         for mk in bm.get("markets", []):
@@ -210,52 +303,179 @@ def fetch_odds_provider(fixture: Dict) -> Dict:
         "provider": "the_odds_api",
         "fixture_id": fixture["fixture_id"],
         "league": league,
-        "collected_at": NOW.isoformat(),
+        "collected_at": (now or NOW).isoformat(),
         "markets": markets,
     }
 
 # =====================================================
 # SNAPSHOT WRITER
 # =====================================================
-def write_snapshot(fixture: Dict, odds_payload: Dict):
+def read_meta(meta_path: str) -> Dict:
+    if not os.path.exists(meta_path):
+        return {}
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except ValueError:
+        return {}
+
+def write_meta(meta_path: str, meta: Dict):
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, ensure_ascii=False)
+
+def write_snapshot(fixture: Dict, odds_payload: Dict, now: Optional[datetime] = None) -> bool:
+    """Write a snapshot unless its markets match the last one; returns True if written."""
+    now = now or NOW
     league = fixture["league"]
     fid = fixture["fixture_id"]
 
     base_dir = os.path.join(ODDS_BASE, f"league={league}", f"fixture={fid}")
     ensure_dir(base_dir)
 
-    meta_path = os.path.join(base_dir, "meta.json")
-    if not os.path.exists(meta_path):
-        with open(meta_path, "w", encoding="utf-8") as f:
-            json.dump({
-                "fixture_id": fid,
-                "league": league,
-                "home": fixture.get("home"),
-                "away": fixture.get("away"),
-                "kickoff_ts": fixture.get("kickoff_ts"),
-                "kickoff_utc": fixture["_kickoff_dt"].isoformat(),
-                "created_at": NOW.isoformat(),
-            }, f, indent=2, ensure_ascii=False)
-
-    snap_name = f"snapshot_{ts_for_filename(NOW)}.json"
-    with open(os.path.join(base_dir, snap_name), "w", encoding="utf-8") as f:
-        json.dump(odds_payload, f, indent=2, ensure_ascii=False)
+    meta_path = os.path.join(base_dir, META_NAME)
+    meta = read_meta(meta_path)
+    if not meta:
+        meta = {
+            "fixture_id": fid,
+            "league": league,
+            "home": fixture.get("home"),
+            "away": fixture.get("away"),
+            "kickoff_ts": fixture.get("kickoff_ts"),
+            "kickoff_utc": fixture["_kickoff_dt"].isoformat(),
+            "created_at": now.isoformat(),
+        }
+
+    cache_key = f"{league}/{fid}"
+    digest = markets_hash(odds_payload.get("markets", {}))
+    last = _LAST_MARKETS_HASH.get(cache_key) or meta.get("last_markets_hash")
+
+    meta["heartbeat_at"] = now.isoformat()
+
+    if digest == last:
+        _LAST_MARKETS_HASH[cache_key] = digest
+        write_meta(meta_path, meta)
+        return False
+
+    if SNAPSHOT_LAYOUT == LAYOUT_LOG:
+        append_snapshot(base_dir, now, odds_payload)
+    else:
+        snap_name = f"snapshot_{ts_for_filename(now)}.json"
+        with open(os.path.join(base_dir, snap_name), "w", encoding="utf-8") as f:
+            json.dump(odds_payload, f, indent=2, ensure_ascii=False)
+
+    meta["last_markets_hash"] = digest
+    write_meta(meta_path, meta)
+    _LAST_MARKETS_HASH[cache_key] = digest
+    return True
+
+# =====================================================
+# COLLECTION CYCLE
+# =====================================================
+def collect_cycle(
+    fixtures: Dict[str, Dict],
+    sport_keys: List[str],
+    now: datetime,
+) -> Tuple[int, int]:
+    events_by_sport, failed = fetch_all_sport_events(
+        sport_keys, nearest_kickoffs(fixtures, now)
+    )
+    skipped = len(sport_keys) - len(events_by_sport) - len(failed)
+    print(f"Sport keys fetched: {len(events_by_sport)}, failed: {len(failed)}, over budget: {skipped}")
+
+    indexes = {sk: build_event_index(evs) for sk, evs in events_by_sport.items()}
+
+    written = 0
+    unchanged = 0
+    for fixture in fixtures.values():
+        index = indexes.get(SPORT_KEYS.get(fixture["league"]))
+        if index is None:
+            continue
+        odds = fetch_odds_provider(fixture, index, now)
+        if not odds:
+            continue
+        if write_snapshot(fixture, odds, now):
+            written += 1
+        else:
+            unchanged += 1
+
+    return written, unchanged
+
+# =====================================================
+# DAEMON SCHEDULING
+# =====================================================
+def poll_interval(seconds_to_kickoff: float) -> Optional[int]:
+    if seconds_to_kickoff <= 0:
+        return None
+    for max_sec, interval in POLL_CADENCE:
+        if seconds_to_kickoff <= max_sec:
+            return interval
+    return None
+
+def sport_schedule(fixtures: Dict[str, Dict], now: datetime) -> Dict[str, int]:
+    schedule: Dict[str, int] = {}
+    for sport_key, secs in nearest_kickoffs(fixtures, now).items():
+        interval = poll_interval(secs)
+        if interval:
+            schedule[sport_key] = interval
+    return schedule
+
+def run_daemon():
+    fixtures: Dict[str, Dict] = {}
+    loaded_at = 0.0
+    next_due: Dict[str, float] = {}
+
+    print("Odds Collector daemon started.")
+    while True:
+        now_ts = time.time()
+        now = datetime.fromtimestamp(now_ts, tz=timezone.utc)
+
+        if now_ts - loaded_at >= FIXTURE_RELOAD_SEC:
+            fixtures = load_fixtures(now)
+            loaded_at = now_ts
+            print(f"[{now.isoformat()}] Fixtures in window: {len(fixtures)}")
+
+        schedule = sport_schedule(fixtures, now)
+        due = sorted(sk for sk in schedule if next_due.get(sk, 0) <= now_ts)
+
+        if due:
+            # kickoff already passed -> fixture no longer polled
+            upcoming = {fid: fx for fid, fx in fixtures.items() if fx["_kickoff_dt"] > now}
+            written, unchanged = collect_cycle(upcoming, due, now)
+            for sk in due:
+                next_due[sk] = now_ts + schedule[sk]
+            print(
+                f"[{now.isoformat()}] Polled {', '.join(due)} - "
+                f"snapshots written: {written}, unchanged: {unchanged}"
+            )
+
+        wake = min(
+            [next_due.get(sk, now_ts) for sk in schedule]
+            + [loaded_at + FIXTURE_RELOAD_SEC]
+        )
+        sleep_for = min(max(wake - time.time(), DAEMON_MIN_SLEEP_SEC), DAEMON_MAX_SLEEP_SEC)
+        time.sleep(sleep_for)
 
 # =====================================================
 # MAIN
 # =====================================================
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--daemon", action="store_true",
+        help="keep running and poll each league on a kickoff-aware cadence"
+    )
+    args = parser.parse_args()
+
+    if args.daemon:
+        run_daemon()
+        return
+
     fixtures = load_fixtures()
     print(f"Eligible fixtures for odds window: {len(fixtures)}")
 
-    written = 0
-    for fixture in fixtures.values():
-        odds = fetch_odds_provider(fixture)
-        if odds:
-            write_snapshot(fixture, odds)
-            written += 1
+    written, unchanged = collect_cycle(fixtures, required_sport_keys(fixtures), NOW)
 
-    print(f"Odds Collector v2.1 finished. Snapshots written: {written}")
+    print(f"Odds Collector v2.1 finished. Snapshots written: {written}, unchanged: {unchanged}")
 
 if __name__ == "__main__":
     main()
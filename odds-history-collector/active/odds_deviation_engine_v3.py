@@ -1,18 +1,240 @@
 import os
 import json
+import argparse
+import time
 from datetime import datetime
 
+from odds_normalizer_v1 import load_edge_snapshots, load_provider_snapshot, selection_key
+from snapshot_log import fixture_signature, list_snapshots, signature_time
+from steam_detector import RETENTION_SEC, SteamDetector
+
 CANON_BASE = os.path.join("odds", "canonical")
+ODDS_V2_BASE = os.path.join("odds", "v2")
 OUT_DIR = os.path.join("odds", "deviations")
 OUT_FILE = os.path.join(OUT_DIR, "events.json")
+STREAM_FILE = os.path.join(OUT_DIR, "events_stream.jsonl")
+STEAM_FILE = os.path.join(OUT_DIR, "steam_stream.jsonl")
 
 THRESHOLD = 0.20
 ASIAN_BOOKS = {"pinnacle", "sbobet", "bet188"}
 
+POLL_SEC = 5
+
 def ensure(p):
     os.makedirs(p, exist_ok=True)
 
+def write_events(events):
+    tmp = OUT_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "schema": "odds_events_v1",
+                "items": events
+            },
+            f,
+            indent=2,
+            ensure_ascii=False
+        )
+    os.replace(tmp, OUT_FILE)
+
+# -----------------------------
+# STREAMING
+# -----------------------------
+class DeviationStream:
+    """
+    Follows odds/v2 as snapshots land and keeps, per selection, the opening
+    and last-seen price. An event is emitted the moment |current - opening|
+    crosses THRESHOLD, stamped with the snapshot's own observation time.
+    Every book's prices also feed a SteamDetector; its moves collect in
+    self.steam_events. Fixtures the collector stopped writing to for
+    RETENTION_SEC (kicked off, out of the window) are dropped by prune().
+    """
+
+    def __init__(self):
+        self.opening = {}
+        self.active = {}
+        # (league, fixture_id) -> (signature, latest snapshot ts)
+        self.seen = {}
+        # (league, fixture_id) -> its keys in opening / active
+        self.fixture_keys = {}
+        self.steam = SteamDetector()
+        self.steam_events = []
+
+    def observe(self, league, fixture_id, snap, emit=True, track_steam=True):
+        emitted = []
+        ts = snap["ts"].isoformat()
+        epoch = snap["ts"].timestamp()
+
+        for market, entries in snap["markets"].items():
+            for bm_entry in entries:
+                book = bm_entry.get("bookmaker")
+
+                for o in bm_entry.get("outcomes", []):
+                    c = o.get("price")
+                    if c is None:
+                        continue
+
+                    sel = selection_key(o)
+                    if track_steam:
+                        steam = self.steam.observe(league, fixture_id, market, book, sel, epoch, c)
+                        if steam and emit:
+                            self.steam_events.append({"ts": ts, **steam})
+
+                    if book not in ASIAN_BOOKS:
+                        continue
+
+                    key = (league, fixture_id, market, book, sel)
+                    if key not in self.opening:
+                        self.opening[key] = c
+                        self.fixture_keys.setdefault((league, fixture_id), set()).add(key)
+                    o_price = self.opening[key]
+
+                    delta = round(c - o_price, 3)
+                    abs_delta = abs(delta)
+
+                    if abs_delta < THRESHOLD:
+                        self.active.pop(key, None)
+                        continue
+
+                    event = {
+                        "ts": ts,
+                        "league": league,
+                        "fixture_id": fixture_id,
+                        "market": market,
+                        "selection": key[4],
+                        "provider": book,
+                        "opening": o_price,
+                        "current": c,
+                        "delta": delta,
+                        "abs_delta": abs_delta,
+                    }
+                    crossed = key not in self.active
+                    self.active[key] = event
+                    if crossed and emit:
+                        emitted.append(event)
+
+        return emitted
+
+    def scan(self, emit=True, now_ts=None):
+        emitted = []
+        if not os.path.exists(ODDS_V2_BASE):
+            return emitted
+        stale_before = (now_ts or time.time()) - RETENTION_SEC
+
+        for league_dir in sorted(os.listdir(ODDS_V2_BASE)):
+            if not league_dir.startswith("league="):
+                continue
+            league = league_dir.split("=", 1)[1]
+            league_path = os.path.join(ODDS_V2_BASE, league_dir)
+
+            for fix_dir in sorted(os.listdir(league_path)):
+                if not fix_dir.startswith("fixture="):
+                    continue
+                fixture_id = fix_dir.split("=", 1)[1]
+                fpath = os.path.join(league_path, fix_dir)
+
+                fkey = (league, fixture_id)
+                sig = fixture_signature(fpath)
+                prev = self.seen.get(fkey)
+                if prev and prev[0] == sig:
+                    continue
+                if prev is None and signature_time(sig) < stale_before:
+                    # aged out of the collection window: never tracked
+                    continue
+
+                refs = list_snapshots(fpath)
+                if not refs:
+                    continue
+
+                if prev is None and not emit:
+                    # bootstrap: opening and latest are enough to seed state
+                    snaps = [s for s in load_edge_snapshots(fpath, refs) if s]
+                else:
+                    since = prev[1] if prev else None
+                    snaps = [
+                        load_provider_snapshot(fpath, ts, ref)
+                        for ts, ref in refs
+                        if since is None or ts > since
+                    ]
+
+                for i, snap in enumerate(snaps):
+                    if snap:
+                        # opening -> latest is no short-term move; seed rings from latest only
+                        track_steam = emit or i == len(snaps) - 1
+                        emitted.extend(self.observe(league, fixture_id, snap, emit, track_steam))
+
+                self.seen[fkey] = (sig, refs[-1][0])
+
+        return emitted
+
+    def prune(self, now_ts):
+        """Forget fixtures with no collector write in RETENTION_SEC (and steam state)."""
+        stale = [
+            fkey for fkey, (sig, _) in self.seen.items()
+            if signature_time(sig) < now_ts - RETENTION_SEC
+        ]
+        for fkey in stale:
+            self.seen.pop(fkey, None)
+            for key in self.fixture_keys.pop(fkey, ()):
+                self.opening.pop(key, None)
+                self.active.pop(key, None)
+
+        self.steam.prune(now_ts)
+        return len(stale)
+
+def follow():
+    ensure(OUT_DIR)
+    stream = DeviationStream()
+    stream.scan(emit=False)
+    write_events(list(stream.active.values()))
+    print(f"Following {ODDS_V2_BASE} - active deviations: {len(stream.active)}")
+
+    while True:
+        time.sleep(POLL_SEC)
+        emitted = stream.scan()
+        if stream.prune(time.time()) and not emitted:
+            write_events(list(stream.active.values()))
+
+        if stream.steam_events:
+            with open(STEAM_FILE, "a", encoding="utf-8") as f:
+                for ev in stream.steam_events:
+                    f.write(json.dumps(ev, ensure_ascii=False) + "\n")
+            for ev in stream.steam_events:
+                print(
+                    f"[{ev['ts']}] STEAM {ev['league']} {ev['fixture_id']} {ev['market']} "
+                    f"{ev['selection']} {ev['direction']}: {', '.join(ev['books'])}"
+                )
+            stream.steam_events = []
+
+        if not emitted:
+            continue
+
+        with open(STREAM_FILE, "a", encoding="utf-8") as f:
+            for ev in emitted:
+                f.write(json.dumps(ev, ensure_ascii=False) + "\n")
+        write_events(list(stream.active.values()))
+
+        for ev in emitted:
+            print(
+                f"[{ev['ts']}] {ev['league']} {ev['fixture_id']} {ev['market']} "
+                f"{ev['selection']} {ev['provider']}: {ev['opening']} -> {ev['current']}"
+            )
+
+# -----------------------------
+# BATCH
+# -----------------------------
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--follow", action="store_true",
+        help="stream deviation events from odds/v2 as snapshots land"
+    )
+    args = parser.parse_args()
+
+    if args.follow:
+        follow()
+        return
+
     ensure(OUT_DIR)
     events = []
 
@@ -34,6 +256,8 @@ def main():
                 canon = json.load(f)
 
             fixture_id = canon["fixture_id"]
+            # canonical carries no per-price ts; current_ts is when these prices were seen
+            observed_at = canon.get("current_ts")
 
             for market, books in canon.get("markets", {}).items():
                 for book, sels in books.items():
@@ -55,7 +279,7 @@ def main():
                             continue
 
                         events.append({
-                            "ts": ts or datetime.utcnow().isoformat(),
+                            "ts": ts or observed_at or datetime.utcnow().isoformat(),
                             "league": league,
                             "fixture_id": fixture_id,
                             "market": market,
@@ -67,16 +291,7 @@ def main():
                             "abs_delta": abs_delta,
                         })
 
-    with open(OUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(
-            {
-                "schema": "odds_events_v1",
-                "items": events
-            },
-            f,
-            indent=2,
-            ensure_ascii=False
-        )
+    write_events(events)
 
     print(f"Events written: {len(events)}")
 
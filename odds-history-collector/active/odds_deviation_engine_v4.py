@@ -0,0 +1,237 @@
+import argparse
+import json
+import os
+from typing import Dict, List
+
+import numpy as np
+
+# =====================================================
+# PATHS
+# =====================================================
+ODDS_CANON_BASE = os.path.join("odds", "canonical")
+ODDS_DEV_BASE = os.path.join("odds", "deviations")
+RADAR_FILE = os.path.join(ODDS_DEV_BASE, "radar.json")
+EVENTS_FILE = os.path.join(ODDS_DEV_BASE, "events.json")
+
+# =====================================================
+# THRESHOLDS
+# =====================================================
+# radar (odds_radar_v1): per-market thresholds, every bookmaker
+THRESHOLDS = {
+    "h2h": 0.20,
+    "totals": 0.10,
+}
+
+# events (odds_events_v1): one threshold, Asian books only
+EVENT_THRESHOLD = 0.20
+ASIAN_BOOKS = {"pinnacle", "sbobet", "bet188"}
+
+RADAR_TOP_K = 50
+
+# =====================================================
+# HELPERS
+# =====================================================
+def ensure_dir(path: str):
+    os.makedirs(path, exist_ok=True)
+
+def write_json(path: str, payload: Dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+class Codes:
+    """String -> dense int code, in first-seen order."""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def code(self, value: str) -> int:
+        c = self.index.get(value)
+        if c is None:
+            c = self.index[value] = len(self.values)
+            self.values.append(value)
+        return c
+
+# =====================================================
+# LOAD (FLAT COLUMNS)
+# =====================================================
+def load_prices() -> Dict:
+    opening: List[float] = []
+    current: List[float] = []
+    market_code: List[int] = []
+    book_code: List[int] = []
+    fixture_idx: List[int] = []
+    selections: List[str] = []
+
+    markets, books = Codes(), Codes()
+    fixtures: List[Dict] = []
+
+    for league_dir in sorted(os.listdir(ODDS_CANON_BASE)):
+        if not league_dir.startswith("league="):
+            continue
+
+        league = league_dir.split("=", 1)[1]
+        league_path = os.path.join(ODDS_CANON_BASE, league_dir)
+
+        for fixture_dir in sorted(os.listdir(league_path)):
+            if not fixture_dir.startswith("fixture="):
+                continue
+
+            canon_path = os.path.join(league_path, fixture_dir, "canonical.json")
+            if not os.path.exists(canon_path):
+                continue
+
+            with open(canon_path, "r", encoding="utf-8") as f:
+                canonical = json.load(f)
+
+            fi = len(fixtures)
+            fixtures.append({
+                "fixture_id": canonical["fixture_id"],
+                "league": league,
+                "current_ts": canonical.get("current_ts"),
+            })
+
+            for market, bks in canonical.get("markets", {}).items():
+                mc = markets.code(market)
+                for book, sels in bks.items():
+                    bc = books.code(book)
+                    for sel, prices in sels.items():
+                        o = prices.get("opening")
+                        c = prices.get("current")
+                        opening.append(np.nan if o is None else o)
+                        current.append(np.nan if c is None else c)
+                        market_code.append(mc)
+                        book_code.append(bc)
+                        fixture_idx.append(fi)
+                        selections.append(sel)
+
+    return {
+        "opening": np.asarray(opening, dtype=np.float64),
+        "current": np.asarray(current, dtype=np.float64),
+        "market": np.asarray(market_code, dtype=np.int32),
+        "book": np.asarray(book_code, dtype=np.int32),
+        "fixture": np.asarray(fixture_idx, dtype=np.int32),
+        "selections": selections,
+        "markets": markets.values,
+        "books": books.values,
+        "fixtures": fixtures,
+    }
+
+# =====================================================
+# VECTORIZED SCAN
+# =====================================================
+def per_fixture_best(rows: np.ndarray, rank: np.ndarray, fixture: np.ndarray, n_fixtures: int) -> np.ndarray:
+    """Row with the highest rank per fixture (first one on ties)."""
+    if not rows.size:
+        return rows
+
+    best = np.full(n_fixtures, -np.inf)
+    np.maximum.at(best, fixture[rows], rank[rows])
+
+    winners = rows[rank[rows] == best[fixture[rows]]]
+    _, first = np.unique(fixture[winners], return_index=True)
+    return winners[first]
+
+def top_k(rows: np.ndarray, rank: np.ndarray, k: int) -> np.ndarray:
+    """Highest-ranked rows, descending; argpartition first, then sort only k."""
+    if k and rows.size > k:
+        rows = rows[np.argpartition(-rank[rows], k - 1)[:k]]
+    return rows[np.lexsort((rows, -rank[rows]))]
+
+def scan(data: Dict, radar_top_k: int = RADAR_TOP_K):
+    opening, current = data["opening"], data["current"]
+    market, book, fixture = data["market"], data["book"], data["fixture"]
+
+    valid = ~np.isnan(opening) & ~np.isnan(current)
+    delta = current - opening
+    abs_delta = np.abs(delta)
+
+    market_thr = np.array(
+        [THRESHOLDS.get(m, np.inf) for m in data["markets"]], dtype=np.float64
+    )
+    is_asian = np.array([b in ASIAN_BOOKS for b in data["books"]], dtype=bool)
+
+    # radar: per-market threshold, best row per fixture, global top-K;
+    # ranked on the rounded |delta| the radar reports (ties keep the first row)
+    rank = np.round(abs_delta, 3)
+    radar_rows = np.nonzero(valid & (abs_delta >= market_thr[market]))[0]
+    radar_rows = per_fixture_best(radar_rows, rank, fixture, len(data["fixtures"]))
+    radar_rows = top_k(radar_rows, rank, radar_top_k)
+
+    # events: Asian books, delta rounded like the v3 engine before comparing
+    delta3 = np.round(delta, 3)
+    event_rows = np.nonzero(valid & is_asian[book] & (np.abs(delta3) >= EVENT_THRESHOLD))[0]
+
+    return radar_rows, event_rows, delta, abs_delta, delta3
+
+# =====================================================
+# OUTPUT
+# =====================================================
+def radar_item(data: Dict, r: int, delta: np.ndarray, abs_delta: np.ndarray) -> Dict:
+    fx = data["fixtures"][data["fixture"][r]]
+    return {
+        "fixture_id": fx["fixture_id"],
+        "league": fx["league"],
+        "market": data["markets"][data["market"][r]],
+        "selection": data["selections"][r],
+        "bookmaker": data["books"][data["book"][r]],
+        "opening": float(data["opening"][r]),
+        "current": float(data["current"][r]),
+        "delta": round(float(delta[r]), 3),
+        "abs_delta": round(float(abs_delta[r]), 3),
+    }
+
+def event_item(data: Dict, r: int, delta3: np.ndarray) -> Dict:
+    fx = data["fixtures"][data["fixture"][r]]
+    d = float(delta3[r])
+    return {
+        "ts": fx["current_ts"],
+        "league": fx["league"],
+        "fixture_id": fx["fixture_id"],
+        "market": data["markets"][data["market"][r]],
+        "selection": data["selections"][r],
+        "provider": data["books"][data["book"][r]],
+        "opening": float(data["opening"][r]),
+        "current": float(data["current"][r]),
+        "delta": d,
+        "abs_delta": abs(d),
+    }
+
+# =====================================================
+# MAIN
+# =====================================================
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--top-k", type=int, default=RADAR_TOP_K,
+        help="radar size (0 keeps every fixture)"
+    )
+    args = parser.parse_args()
+
+    if not os.path.exists(ODDS_CANON_BASE):
+        print("No canonical odds found.")
+        return
+
+    ensure_dir(ODDS_DEV_BASE)
+
+    data = load_prices()
+    radar_rows, event_rows, delta, abs_delta, delta3 = scan(data, args.top_k)
+
+    write_json(RADAR_FILE, {
+        "schema_version": "odds_radar_v1",
+        "items": [radar_item(data, r, delta, abs_delta) for r in radar_rows],
+    })
+    write_json(EVENTS_FILE, {
+        "schema": "odds_events_v1",
+        "items": [event_item(data, r, delta3) for r in event_rows],
+    })
+
+    print(
+        f"Prices scanned: {len(data['selections'])} | "
+        f"radar: {len(radar_rows)} | events: {len(event_rows)}"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
+import argparse
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
+
+from odds_series import SERIES_NAME, Series, SeriesKey, append_point, load_series, save_series
+from snapshot_log import SnapshotRef, fixture_signature, list_snapshots, read_heartbeat, read_snapshot
 
 # =====================================================
 # PATHS
@@ -9,59 +14,166 @@ from typing import Dict, List
 ODDS_V2_BASE = os.path.join("odds", "v2")
 ODDS_CANON_BASE = os.path.join("odds", "canonical")
 
+# latest processed snapshot per "league/fixture" for incremental runs
+MANIFEST_PATH = os.path.join(ODDS_CANON_BASE, "_manifest.json")
+
 # =====================================================
 # HELPERS
 # =====================================================
 def ensure_dir(path: str):
     os.makedirs(path, exist_ok=True)
 
-def parse_ts_from_filename(fname: str) -> datetime:
-    # snapshot_YYYY-MM-DDTHH-MM-SSZ.json
-    ts = fname.replace("snapshot_", "").replace(".json", "")
-    return datetime.strptime(ts, "%Y-%m-%dT%H-%M-%SZ").replace(tzinfo=timezone.utc)
-
 def norm_selection(sel: str) -> str:
     return sel.upper().strip()
 
+def selection_key(o: Dict) -> str:
+    name = norm_selection(o.get("name", ""))
+    point = o.get("point")
+    return f"{name}_{point}" if point is not None else name
+
 # =====================================================
-# NORMALIZATION LOGIC
+# CHANGE MANIFEST
 # =====================================================
-def normalize_fixture_snapshots(league: str, fixture: str, files: List[str]):
-    snapshots = []
+def load_manifest() -> Dict[str, Dict]:
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except ValueError:
+        return {}
+
+def save_manifest(manifest: Dict[str, Dict]):
+    ensure_dir(ODDS_CANON_BASE)
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp, MANIFEST_PATH)
+
+def canonical_exists(league: str, fixture: str) -> bool:
+    return os.path.exists(os.path.join(
+        ODDS_CANON_BASE, f"league={league}", f"fixture={fixture}", "canonical.json"
+    ))
 
-    for fname in files:
-        fpath = os.path.join(
-            ODDS_V2_BASE, f"league={league}", f"fixture={fixture}", fname
-        )
-        with open(fpath, "r", encoding="utf-8") as f:
-            data = json.load(f)
+# =====================================================
+# NORMALIZATION LOGIC
+# =====================================================
+def load_provider_snapshot(fixture_dir: str, ts: datetime, ref: SnapshotRef) -> Optional[Dict]:
+    try:
+        data = read_snapshot(fixture_dir, ref)
+    except ValueError:
+        return None
+
+    # only provider snapshots
+    if data.get("provider") != "the_odds_api":
+        return None
+
+    markets = data.get("markets", {})
+    if not markets:
+        return None
+
+    return {"ts": ts, "markets": markets}
+
+def load_edge_snapshots(
+    fixture_dir: str, refs: List[Tuple[datetime, SnapshotRef]]
+) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """Earliest and latest valid snapshots, walking inward past invalid ones."""
+    opening = None
+    lo = 0
+    while lo < len(refs):
+        opening = load_provider_snapshot(fixture_dir, *refs[lo])
+        if opening:
+            break
+        lo += 1
+
+    if not opening:
+        return None, None
+
+    hi = len(refs) - 1
+    while hi > lo:
+        current = load_provider_snapshot(fixture_dir, *refs[hi])
+        if current:
+            return opening, current
+        hi -= 1
+
+    return opening, opening
 
-        # only provider snapshots
-        if data.get("provider") != "the_odds_api":
+# =====================================================
+# PRICE SERIES (CANONICAL V2)
+# =====================================================
+def read_series_until(out_dir: str) -> Optional[float]:
+    path = os.path.join(out_dir, "canonical.json")
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            prev = json.load(f)
+    except ValueError:
+        return None
+    if prev.get("schema_version") != "odds_canonical_v2" or not prev.get("series_until"):
+        return None
+    return datetime.fromisoformat(prev["series_until"]).timestamp()
+
+def update_series(
+    fixture_dir: str,
+    out_dir: str,
+    refs: List[Tuple[datetime, SnapshotRef]],
+    since: Optional[float],
+) -> Tuple[Dict[SeriesKey, Series], Optional[float]]:
+    """Extend the fixture's price series with snapshots newer than `since`."""
+    path = os.path.join(out_dir, SERIES_NAME)
+    series = load_series(path) if since is not None else {}
+    until = since
+
+    for ts, ref in refs:
+        t = ts.timestamp()
+        if since is not None and t <= since:
             continue
 
-        markets = data.get("markets", {})
-        if not markets:
+        snap = load_provider_snapshot(fixture_dir, ts, ref)
+        if not snap:
             continue
 
-        snapshots.append({
-            "ts": parse_ts_from_filename(fname),
-            "markets": markets
-        })
+        for market_key, entries in snap["markets"].items():
+            for bm_entry in entries:
+                for o in bm_entry["outcomes"]:
+                    key = (market_key, bm_entry["bookmaker"], selection_key(o))
+                    append_point(series, key, t, o.get("price"))
+        until = t
+
+    save_series(path, series)
+    return series, until
 
-    if not snapshots:
+# =====================================================
+# CANONICAL
+# =====================================================
+def normalize_fixture_snapshots(
+    league: str,
+    fixture: str,
+    refs: List[Tuple[datetime, SnapshotRef]],
+    with_series: bool = False,
+    rebuild: bool = False,
+):
+    fixture_dir = os.path.join(ODDS_V2_BASE, f"league={league}", f"fixture={fixture}")
+
+    # refs are sorted by the timestamp in their name/index: only the edges are parsed
+    opening, current = load_edge_snapshots(fixture_dir, refs)
+    if not opening:
         return
 
-    snapshots.sort(key=lambda x: x["ts"])
-    opening = snapshots[0]
-    current = snapshots[-1]
+    # unchanged polls write no snapshot, only a heartbeat: the latest
+    # prices were still current at that time
+    current_ts = current["ts"]
+    heartbeat = read_heartbeat(fixture_dir)
+    if heartbeat and heartbeat > current_ts:
+        current_ts = heartbeat
 
     canonical = {
         "schema_version": "odds_canonical_v1",
         "league": league,
         "fixture_id": fixture,
         "opening_ts": opening["ts"].isoformat(),
-        "current_ts": current["ts"].isoformat(),
+        "current_ts": current_ts.isoformat(),
         "markets": {}
     }
 
@@ -74,10 +186,7 @@ def normalize_fixture_snapshots(league: str, fixture: str, files: List[str]):
             canonical["markets"][market_key].setdefault(bm, {})
 
             for o in bm_entry["outcomes"]:
-                name = norm_selection(o.get("name", ""))
-                point = o.get("point")
-
-                sel = f"{name}_{point}" if point is not None else name
+                sel = selection_key(o)
 
                 canonical["markets"][market_key][bm][sel] = {
                     "opening": None,
@@ -95,10 +204,7 @@ def normalize_fixture_snapshots(league: str, fixture: str, files: List[str]):
                 continue
 
             for o in bm_entry["outcomes"]:
-                name = norm_selection(o.get("name", ""))
-                point = o.get("point")
-
-                sel = f"{name}_{point}" if point is not None else name
+                sel = selection_key(o)
 
                 if sel in canonical["markets"][market_key][bm]:
                     canonical["markets"][market_key][bm][sel]["opening"] = o.get("price")
@@ -109,45 +215,144 @@ def normalize_fixture_snapshots(league: str, fixture: str, files: List[str]):
     )
     ensure_dir(out_dir)
 
+    if with_series:
+        since = None if rebuild else read_series_until(out_dir)
+        series, until = update_series(fixture_dir, out_dir, refs, since)
+        canonical["schema_version"] = "odds_canonical_v2"
+        canonical["series_file"] = SERIES_NAME
+        canonical["series_until"] = (
+            datetime.fromtimestamp(until, tz=timezone.utc).isoformat() if until else None
+        )
+        canonical["series_count"] = len(series)
+        canonical["series_points"] = sum(len(ts) for ts, _ in series.values())
+
     with open(os.path.join(out_dir, "canonical.json"), "w", encoding="utf-8") as f:
         json.dump(canonical, f, indent=2, ensure_ascii=False)
 
+# =====================================================
+# WORKERS
+# =====================================================
+def normalize_task(task: Tuple) -> Tuple[str, Optional[str]]:
+    """Process-pool entry point: (key, error) so one bad fixture never stops the run."""
+    league, fixture, refs, with_series, rebuild = task
+    try:
+        normalize_fixture_snapshots(
+            league, fixture, refs, with_series=with_series, rebuild=rebuild
+        )
+    except Exception as e:
+        return f"{league}/{fixture}", f"{type(e).__name__}: {e}"
+    return f"{league}/{fixture}", None
+
+def run_tasks(tasks: List[Tuple], workers: int) -> List[Tuple[str, Optional[str]]]:
+    if workers <= 1 or len(tasks) <= 1:
+        return [normalize_task(t) for t in tasks]
+
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map keeps task order, so results are deterministic whatever the scheduling
+        return list(pool.map(normalize_task, tasks, chunksize=chunksize))
+
 # =====================================================
 # MAIN
 # =====================================================
 def main():
-    total = 0
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--full", action="store_true",
+        help="ignore the manifest and re-normalize every fixture"
+    )
+    parser.add_argument(
+        "--series", action="store_true",
+        help="write odds_canonical_v2 with the full price series sidecar"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="normalize fixtures in N worker processes"
+    )
+    args = parser.parse_args()
+
+    skipped = 0
 
     if not os.path.exists(ODDS_V2_BASE):
         print("No odds/v2 directory found.")
         return
 
-    for league_dir in os.listdir(ODDS_V2_BASE):
+    manifest = {} if args.full else load_manifest()
+    tasks: List[Tuple] = []
+    pending: Dict[str, Dict] = {}
+
+    for league_dir in sorted(os.listdir(ODDS_V2_BASE)):
         if not league_dir.startswith("league="):
             continue
 
         league = league_dir.split("=", 1)[1]
         league_path = os.path.join(ODDS_V2_BASE, league_dir)
 
-        for fixture_dir in os.listdir(league_path):
+        for fixture_dir in sorted(os.listdir(league_path)):
             if not fixture_dir.startswith("fixture="):
                 continue
 
             fixture = fixture_dir.split("=", 1)[1]
             fpath = os.path.join(league_path, fixture_dir)
+            key = f"{league}/{fixture}"
+            entry = manifest.get(key)
+            sig = fixture_signature(fpath)
 
-            files = [
-                f for f in os.listdir(fpath)
-                if f.startswith("snapshot_") and f.endswith(".json")
-            ]
+            # a v1-only entry is stale once --series asks for the price series
+            series_ok = not args.series or bool(entry and entry.get("series"))
 
-            if len(files) < 2:
+            if entry and entry.get("sig") == sig and series_ok:
+                skipped += 1
                 continue
 
-            normalize_fixture_snapshots(league, fixture, files)
-            total += 1
+            # both layouts: snapshot_<ts>.json files and the append-only log
+            refs = list_snapshots(fpath)
+            latest = refs[-1][0].isoformat() if refs else None
+            heartbeat = read_heartbeat(fpath)
+            heartbeat = heartbeat.isoformat() if heartbeat else None
+            state = {
+                "latest": latest,
+                "count": len(refs),
+                "heartbeat": heartbeat,
+                "sig": sig,
+                "series": args.series,
+            }
+
+            # one snapshot is enough (opening = current): with markets-hash
+            # dedup, a fixture whose prices never move keeps exactly one
+            if not refs:
+                manifest[key] = state
+                continue
+
+            if (
+                entry
+                and entry.get("latest") == latest
+                and entry.get("count") == len(refs)
+                and entry.get("heartbeat") == heartbeat
+                and series_ok
+                and canonical_exists(league, fixture)
+            ):
+                entry["sig"] = sig
+                skipped += 1
+                continue
 
-    print(f"Canonical odds written for {total} fixtures.")
+            tasks.append((league, fixture, refs, args.series, args.full))
+            pending[key] = state
+
+    errors = []
+    for key, error in run_tasks(tasks, args.workers):
+        if error:
+            errors.append((key, error))
+            continue
+        manifest[key] = pending[key]
+
+    save_manifest(manifest)
+    print(
+        f"Canonical odds written for {len(tasks) - len(errors)} fixtures "
+        f"({skipped} unchanged, {len(errors)} failed)."
+    )
+    for key, error in errors:
+        print(f"  FAILED {key}: {error}")
 
 if __name__ == "__main__":
     main()
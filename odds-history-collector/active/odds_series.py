@@ -0,0 +1,90 @@
+import json
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Tuple
+
+# =====================================================
+# FORMAT
+# =====================================================
+# series.bin (sidecar of a odds_canonical_v2 canonical.json):
+#   b"OSR1" | uint32 header length | header JSON | per series: ts[n], price[n]
+# ts are epoch seconds, both columns little-endian float64. The header lists
+# [market, bookmaker, selection, n] in storage order.
+SERIES_NAME = "series.bin"
+MAGIC = b"OSR1"
+HEADER_LEN = struct.Struct("<I")
+
+SeriesKey = Tuple[str, str, str]
+Series = Tuple[array, array]
+
+# =====================================================
+# HELPERS
+# =====================================================
+def _to_le(a: array) -> bytes:
+    if sys.byteorder == "big":
+        a = array("d", a)
+        a.byteswap()
+    return a.tobytes()
+
+def _from_le(raw: bytes) -> array:
+    a = array("d")
+    a.frombytes(raw)
+    if sys.byteorder == "big":
+        a.byteswap()
+    return a
+
+def append_point(series: Dict[SeriesKey, Series], key: SeriesKey, ts: float, price) -> bool:
+    """Append a price change; repeats of the last price are not stored."""
+    if not isinstance(price, (int, float)):
+        return False
+
+    ts_arr, px_arr = series.setdefault(key, (array("d"), array("d")))
+    if px_arr and px_arr[-1] == price:
+        return False
+    if ts_arr and ts < ts_arr[-1]:
+        return False
+
+    ts_arr.append(ts)
+    px_arr.append(float(price))
+    return True
+
+# =====================================================
+# READ / WRITE
+# =====================================================
+def save_series(path: str, series: Dict[SeriesKey, Series]):
+    keys = sorted(series)
+    header = json.dumps(
+        {"series": [[*k, len(series[k][0])] for k in keys]},
+        ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(HEADER_LEN.pack(len(header)))
+        f.write(header)
+        for k in keys:
+            ts_arr, px_arr = series[k]
+            f.write(_to_le(ts_arr))
+            f.write(_to_le(px_arr))
+    os.replace(tmp, path)
+
+def load_series(path: str) -> Dict[SeriesKey, Series]:
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Not an odds series file: {path}")
+        (hlen,) = HEADER_LEN.unpack(f.read(HEADER_LEN.size))
+        header = json.loads(f.read(hlen).decode("utf-8"))
+
+        series: Dict[SeriesKey, Series] = {}
+        for market, book, sel, n in header["series"]:
+            ts_arr = _from_le(f.read(n * 8))
+            px_arr = _from_le(f.read(n * 8))
+            series[(market, book, sel)] = (ts_arr, px_arr)
+
+    return series
@@ -0,0 +1,199 @@
+import calendar
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Mapping, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# =====================================================
+# CONFIG
+# =====================================================
+STATE_PATH = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cache", "quota_budget.json")
+)
+
+# plan size in credits, used until the provider has reported its own counters
+MONTHLY_QUOTA = int(os.getenv("ODDS_API_MONTHLY_QUOTA", "500"))
+
+# leagues with a kickoff this close are always fetched while quota remains
+IMMINENT_SEC = 6 * 60 * 60
+
+# request pacing (token bucket) - replaces fixed sleeps between leagues
+REQUESTS_PER_SEC = 1.0
+BURST = 4
+
+# The Odds API usage headers
+HEADER_REMAINING = "x-requests-remaining"
+HEADER_USED = "x-requests-used"
+
+# =====================================================
+# TOKEN BUCKET
+# =====================================================
+class TokenBucket:
+    def __init__(self, rate: float = REQUESTS_PER_SEC, capacity: int = BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._at) * self.rate)
+                self._at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+# =====================================================
+# STATE FILE LOCK
+# =====================================================
+@contextmanager
+def file_lock(path: str):
+    """Exclusive advisory lock on path, held across processes."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            while True:
+                try:
+                    # LK_LOCK retries for ~10s, then raises; keep waiting
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+# =====================================================
+# QUOTA BUDGET
+# =====================================================
+def _to_int(val) -> Optional[int]:
+    try:
+        return int(float(val))
+    except (TypeError, ValueError):
+        return None
+
+class QuotaBudget:
+    """
+    Persistent daily/monthly credit budget for the Odds API.
+
+    The month's remaining quota (from the provider headers when known) is
+    spread evenly over the days left in the month. Imminent leagues may
+    dip into the rest of the month; everything else waits for today's
+    allowance. The state file is shared by the one-shot collector and the
+    daemon, so every update re-reads it under a file lock.
+    """
+
+    def __init__(self, state_path: str = STATE_PATH, monthly_quota: int = MONTHLY_QUOTA):
+        self.state_path = state_path
+        self.lock_path = state_path + ".lock"
+        self.monthly_quota = monthly_quota
+        self._lock = threading.Lock()
+        self.state = self._load()
+        self._roll(datetime.now(timezone.utc))
+
+    # ---------- persistence ----------
+    def _load(self) -> Dict:
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.state_path)
+
+    @contextmanager
+    def _update(self):
+        # load -> change -> save as one step for threads and processes alike
+        with self._lock, file_lock(self.lock_path):
+            self.state = self._load()
+            self._roll(datetime.now(timezone.utc))
+            yield self.state
+            self.save()
+
+    # ---------- accounting ----------
+    def _roll(self, now: datetime):
+        month = now.strftime("%Y-%m")
+        day = now.date().isoformat()
+
+        if self.state.get("month") != month:
+            self.state.update({
+                "month": month,
+                "month_used": 0,
+                "remaining": None,
+                "provider_used": None,
+            })
+
+        if self.state.get("day") != day:
+            self.state["day"] = day
+            self.state["day_used"] = 0
+            self.state["day_start_remaining"] = self.remaining()
+
+    def remaining(self) -> int:
+        provider = self.state.get("remaining")
+        if provider is not None:
+            return provider
+        return max(0, self.monthly_quota - self.state.get("month_used", 0))
+
+    def daily_allowance(self, now: Optional[datetime] = None) -> int:
+        now = now or datetime.now(timezone.utc)
+        days_in_month = calendar.monthrange(now.year, now.month)[1]
+        days_left = days_in_month - now.day + 1
+        start = self.state.get("day_start_remaining")
+        if start is None:
+            start = self.remaining()
+        return math.ceil(start / days_left)
+
+    def try_spend(self, imminent: bool = False, cost: int = 1) -> bool:
+        """Reserve `cost` credits (one request costs markets x regions)."""
+        with self._update() as state:
+            if self.remaining() < cost:
+                return False
+            if not imminent and state["day_used"] + cost > self.daily_allowance():
+                return False
+
+            state["day_used"] += cost
+            state["month_used"] = state.get("month_used", 0) + cost
+            if state.get("remaining") is not None:
+                state["remaining"] -= cost
+            return True
+
+    def record(self, headers: Mapping[str, str]):
+        remaining = _to_int(headers.get(HEADER_REMAINING))
+        used = _to_int(headers.get(HEADER_USED))
+        if remaining is None and used is None:
+            return
+
+        with self._update() as state:
+            if remaining is not None:
+                state["remaining"] = remaining
+            if used is not None:
+                state["provider_used"] = used
+            state["updated_at"] = datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,119 @@
+import json
+import os
+import struct
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple, Union
+
+# =====================================================
+# LAYOUTS
+# =====================================================
+# "files": one pretty-printed snapshot_<ts>.json per poll (original layout)
+# "log":   one append-only JSON-lines log per fixture + fixed-width index
+LAYOUT_FILES = "files"
+LAYOUT_LOG = "log"
+
+LOG_NAME = "snapshots.jsonl"
+INDEX_NAME = "snapshots.idx"
+
+# collector bookkeeping; heartbeat_at is the last poll that saw this fixture
+META_NAME = "meta.json"
+
+# index record: snapshot epoch seconds, byte offset of its line in the log
+INDEX_RECORD = struct.Struct("<qQ")
+
+# file name for the "files" layout, offset into the log for the "log" layout
+SnapshotRef = Union[str, int]
+
+# =====================================================
+# HELPERS
+# =====================================================
+def ensure_dir(path: str):
+    os.makedirs(path, exist_ok=True)
+
+def parse_ts_from_filename(fname: str) -> datetime:
+    # snapshot_YYYY-MM-DDTHH-MM-SSZ.json
+    ts = fname.replace("snapshot_", "").replace(".json", "")
+    return datetime.strptime(ts, "%Y-%m-%dT%H-%M-%SZ").replace(tzinfo=timezone.utc)
+
+def is_snapshot_file(fname: str) -> bool:
+    return fname.startswith("snapshot_") and fname.endswith(".json")
+
+def fixture_signature(fixture_dir: str) -> List[int]:
+    """Changes whenever a snapshot lands in either layout or a poll checks in."""
+    # new snapshot files bump the directory mtime; log appends grow the index;
+    # unchanged polls only rewrite meta.json
+    idx_path = os.path.join(fixture_dir, INDEX_NAME)
+    idx_size = os.path.getsize(idx_path) if os.path.exists(idx_path) else 0
+    meta_path = os.path.join(fixture_dir, META_NAME)
+    meta_mtime = os.stat(meta_path).st_mtime_ns if os.path.exists(meta_path) else 0
+    return [os.stat(fixture_dir).st_mtime_ns, idx_size, meta_mtime]
+
+def signature_time(sig: List[int]) -> float:
+    """Last write recorded in a fixture_signature, epoch seconds."""
+    # every collector write (snapshot or heartbeat) rewrites meta.json
+    return max(sig[0], sig[2]) / 1e9
+
+def read_heartbeat(fixture_dir: str) -> Optional[datetime]:
+    """Time of the last poll that saw the fixture, changed prices or not."""
+    try:
+        with open(os.path.join(fixture_dir, META_NAME), "r", encoding="utf-8") as f:
+            return datetime.fromisoformat(json.load(f)["heartbeat_at"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+# =====================================================
+# WRITER (LOG LAYOUT)
+# =====================================================
+def append_snapshot(fixture_dir: str, ts: datetime, payload: Dict):
+    ensure_dir(fixture_dir)
+    line = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+    # log first, index second: an index record only ever points at a complete line
+    with open(os.path.join(fixture_dir, LOG_NAME), "ab") as f:
+        offset = f.tell()
+        f.write(line)
+
+    with open(os.path.join(fixture_dir, INDEX_NAME), "ab") as f:
+        f.write(INDEX_RECORD.pack(int(ts.timestamp()), offset))
+
+# =====================================================
+# READERS (BOTH LAYOUTS)
+# =====================================================
+def _read_index(fixture_dir: str) -> List[Tuple[datetime, int]]:
+    path = os.path.join(fixture_dir, INDEX_NAME)
+    if not os.path.exists(path):
+        return []
+
+    with open(path, "rb") as f:
+        raw = f.read()
+
+    usable = len(raw) - len(raw) % INDEX_RECORD.size
+    return [
+        (datetime.fromtimestamp(ts, tz=timezone.utc), offset)
+        for ts, offset in INDEX_RECORD.iter_unpack(raw[:usable])
+    ]
+
+def list_snapshots(fixture_dir: str) -> List[Tuple[datetime, SnapshotRef]]:
+    """All snapshots of a fixture from either layout, oldest first."""
+    refs: List[Tuple[datetime, SnapshotRef]] = []
+
+    for fname in os.listdir(fixture_dir):
+        if not is_snapshot_file(fname):
+            continue
+        try:
+            refs.append((parse_ts_from_filename(fname), fname))
+        except ValueError:
+            continue
+
+    refs.extend(_read_index(fixture_dir))
+    refs.sort(key=lambda r: r[0])
+    return refs
+
+def read_snapshot(fixture_dir: str, ref: SnapshotRef) -> Dict:
+    if isinstance(ref, str):
+        with open(os.path.join(fixture_dir, ref), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    with open(os.path.join(fixture_dir, LOG_NAME), "rb") as f:
+        f.seek(ref)
+        return json.loads(f.readline().decode("utf-8"))
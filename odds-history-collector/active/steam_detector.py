@@ -0,0 +1,179 @@
+from array import array
+from typing import Dict, Hashable, List, Optional, Tuple
+
+# =====================================================
+# CONFIG
+# =====================================================
+# price changes kept per (fixture, market, book, selection); fixed memory
+RING_SIZE = 32
+
+# velocity / acceleration are measured over this window (price per minute)
+WINDOW_SEC = 10 * 60
+
+# a book "moved" when its price changed at least this much within WINDOW_SEC
+STEAM_MOVE = 0.10
+
+# steam: this many books moving the same way within WINDOW_SEC of each other
+STEAM_MIN_BOOKS = 2
+
+# selections with no price change for this long are dropped by prune()
+RETENTION_SEC = 6 * 60 * 60
+
+# =====================================================
+# RING BUFFER
+# =====================================================
+class PriceRing:
+    """
+    Last RING_SIZE price changes of one selection, oldest overwritten first.
+    Repeats of the last price are not stored, so the ring covers changes,
+    not polls.
+    """
+
+    __slots__ = ("ts", "px", "start", "count")
+
+    def __init__(self, size: int = RING_SIZE):
+        self.ts = array("d", bytes(8 * size))
+        self.px = array("d", bytes(8 * size))
+        self.start = 0
+        self.count = 0
+
+    def _at(self, i: int) -> int:
+        return (self.start + i) % len(self.ts)
+
+    def last(self) -> Tuple[float, float]:
+        j = self._at(self.count - 1)
+        return self.ts[j], self.px[j]
+
+    def push(self, ts: float, price: float) -> bool:
+        if self.count:
+            last_ts, last_px = self.last()
+            if ts < last_ts or price == last_px:
+                return False
+
+        size = len(self.ts)
+        if self.count < size:
+            j = self._at(self.count)
+            self.count += 1
+        else:
+            j = self.start
+            self.start = (self.start + 1) % size
+
+        self.ts[j] = ts
+        self.px[j] = price
+        return True
+
+    def price_at(self, ts: float) -> float:
+        """Price in force at ts (or the oldest point kept)."""
+        for i in range(self.count - 1, -1, -1):
+            j = self._at(i)
+            if self.ts[j] <= ts:
+                return self.px[j]
+        return self.px[self.start]
+
+    def velocity(self, window_sec: int = WINDOW_SEC, end: Optional[float] = None) -> float:
+        """Price change per minute over the window ending at end (default: last point)."""
+        if not self.count:
+            return 0.0
+        if end is None:
+            end = self.last()[0]
+        return (self.price_at(end) - self.price_at(end - window_sec)) / (window_sec / 60)
+
+    def acceleration(self, window_sec: int = WINDOW_SEC) -> float:
+        """Change in velocity per minute between the last two windows."""
+        if not self.count:
+            return 0.0
+        end = self.last()[0]
+        v_now = self.velocity(window_sec, end)
+        v_prev = self.velocity(window_sec, end - window_sec)
+        return (v_now - v_prev) / (window_sec / 60)
+
+# =====================================================
+# STEAM DETECTOR
+# =====================================================
+def synced_moves(book_moves: Dict[str, Tuple[float, float]], ts: float, direction: int) -> Dict[str, float]:
+    return {
+        b: m for b, (t, m) in book_moves.items()
+        if ts - t <= WINDOW_SEC and (m > 0) == (direction > 0)
+    }
+
+class SteamDetector:
+    """
+    Feeds every observed price into a PriceRing and reports steam: at least
+    STEAM_MIN_BOOKS books moving the same selection the same way by
+    STEAM_MOVE or more, each within WINDOW_SEC, their moves no further
+    than WINDOW_SEC apart. A steam move is reported once, when it forms.
+    """
+
+    def __init__(self):
+        # (league, fixture_id, market, selection) -> book -> ring
+        self.rings: Dict[Tuple, Dict[str, PriceRing]] = {}
+        # (league, fixture_id, market, selection) -> book -> (ts, move)
+        self.moves: Dict[Tuple, Dict[str, Tuple[float, float]]] = {}
+        # (league, fixture_id, market, selection) -> direction currently reported
+        self.active: Dict[Tuple, int] = {}
+
+    def observe(
+        self,
+        league: str,
+        fixture_id: Hashable,
+        market: str,
+        book: str,
+        selection: str,
+        ts: float,
+        price: float,
+    ) -> Optional[Dict]:
+        key = (league, fixture_id, market, selection)
+        ring = self.rings.setdefault(key, {}).get(book)
+        if ring is None:
+            ring = self.rings[key][book] = PriceRing()
+
+        if not ring.push(ts, price):
+            return None
+
+        move = price - ring.price_at(ts - WINDOW_SEC)
+        book_moves = self.moves.setdefault(key, {})
+        if abs(move) >= STEAM_MOVE:
+            book_moves[book] = (ts, move)
+        else:
+            book_moves.pop(book, None)
+
+        # a reported steam move ends once its books fall out of sync
+        current = self.active.get(key)
+        if current is not None and len(synced_moves(book_moves, ts, current)) < STEAM_MIN_BOOKS:
+            self.active.pop(key, None)
+
+        direction = 1 if move > 0 else -1
+        synced = synced_moves(book_moves, ts, direction)
+        if len(synced) < STEAM_MIN_BOOKS or self.active.get(key) == direction:
+            return None
+        self.active[key] = direction
+
+        rings = self.rings[key]
+        return {
+            "league": league,
+            "fixture_id": fixture_id,
+            "market": market,
+            "selection": selection,
+            "direction": "up" if direction > 0 else "down",
+            "window_sec": WINDOW_SEC,
+            "books": {
+                b: {
+                    "move": round(m, 3),
+                    "velocity": round(rings[b].velocity(), 4),
+                    "acceleration": round(rings[b].acceleration(), 5),
+                }
+                for b, m in sorted(synced.items())
+            },
+        }
+
+    def prune(self, now_ts: float) -> int:
+        """Drop selections with no price change in RETENTION_SEC."""
+        stale: List[Tuple] = [
+            key for key, books in self.rings.items()
+            if all(now_ts - r.last()[0] > RETENTION_SEC for r in books.values())
+        ]
+        for key in stale:
+            self.rings.pop(key, None)
+            self.moves.pop(key, None)
+            self.active.pop(key, None)
+        return len(stale)
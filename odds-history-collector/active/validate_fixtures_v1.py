@@ -1,117 +1,311 @@
+import argparse
+import hashlib
 import json
 import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
 
+from fixture_tree import DATE_PAD_DAYS, date_files, league_dirs
+
+# =====================================================
+# CONFIG
+# =====================================================
 BASE_DIR = os.path.join("fixtures", "v1")
-LEAGUES_ALLOWED = {"ENG1", "ESP1", "FRA1", "GRE1"}
-
-NOW = datetime.now(timezone.utc)
-PAST_LIMIT = NOW - timedelta(hours=24)
-FUTURE_LIMIT = NOW + timedelta(days=7)
-
-report = {
-    "ok": True,
-    "generated_at": NOW.isoformat(),
-    "totals": {
-        "files": 0,
-        "fixtures": 0,
-        "flagged": 0,
-        "critical": 0
-    },
-    "issues": [],
-    "duplicates": [],
-    "by_league": {},
-    "by_date": {},
-}
-
-seen_ids = {}
-seen_keys = {}
-
-def flag(level, msg, fixture=None, context=None):
-    report["issues"].append({
-        "level": level,
-        "message": msg,
-        "fixture": fixture,
-        "context": context
-    })
-    report["totals"]["flagged"] += 1
-    if level == "CRITICAL":
-        report["totals"]["critical"] += 1
-        report["ok"] = False
+LEAGUES_ALLOWED = {"ENG1", "ESP1", "FRA1", "GRE1", "ITA1"}
+
+PAST_WINDOW = timedelta(hours=24)
+FUTURE_WINDOW = timedelta(days=7)
+
+REPORT_FILE = "fixtures_validation_report.json"
+CACHE_NAME = "_validation_cache.json"
+CACHE_VERSION = 1
 
+# report size caps; totals stay exact
+MAX_ISSUES = 200
+MAX_DUPLICATES = 100
+
+# =====================================================
+# HELPERS
+# =====================================================
 def parse_dt(val):
     try:
         return datetime.fromisoformat(val.replace("Z", "+00:00"))
     except Exception:
         return None
 
-for league_dir in os.listdir(BASE_DIR):
-    if not league_dir.startswith("league="):
-        continue
+def summarize(fx: Dict) -> Dict:
+    # compact fixture reference for the report (not a full copy)
+    return {
+        "fixture_id": fx.get("fixture_id"),
+        "home": fx.get("home"),
+        "away": fx.get("away"),
+        "kickoff_utc": fx.get("kickoff_utc"),
+    }
+
+def file_signature(path: str) -> List[int]:
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+# =====================================================
+# PER FILE (PARALLEL, CACHEABLE)
+# =====================================================
+def validate_file(path: str) -> Dict:
+    """
+    Checks that depend only on the file's own content. The result is
+    independent of the clock and of other files, so it can be cached by
+    content hash; window and duplicate checks happen in merge().
+    """
+    with open(path, "rb") as f:
+        raw = f.read()
+
+    result = {"hash": hashlib.sha1(raw).hexdigest(), "is_json": True, "is_list": True, "fixtures": []}
+
+    try:
+        data = json.loads(raw.decode("utf-8"))
+    except ValueError:
+        result["is_json"] = False
+        return result
+
+    if not isinstance(data, list):
+        result["is_list"] = False
+        return result
+
+    for fx in data:
+        kickoff = parse_dt(fx.get("kickoff_utc"))
+        result["fixtures"].append({
+            "summary": summarize(fx),
+            "missing_teams": not fx.get("home") or not fx.get("away"),
+            "kickoff_ts": kickoff.timestamp() if kickoff else None,
+        })
 
-    league = league_dir.split("=", 1)[1]
-    if league not in LEAGUES_ALLOWED:
-        flag("ERROR", f"Unexpected league folder {league}", context=league_dir)
-        continue
+    return result
 
-    league_path = os.path.join(BASE_DIR, league_dir)
-    report["by_league"].setdefault(league, 0)
+# =====================================================
+# MERGE (WINDOW + CROSS-FILE DUPLICATES)
+# =====================================================
+class Report:
+    def __init__(self, now: datetime):
+        self.data = {
+            "ok": True,
+            "generated_at": now.isoformat(),
+            "totals": {
+                "files": 0,
+                "fixtures": 0,
+                "flagged": 0,
+                "critical": 0
+            },
+            "issues": [],
+            "issues_truncated": 0,
+            "duplicates": [],
+            "duplicates_truncated": 0,
+            "by_league": {},
+            "by_date": {},
+        }
 
-    for fname in os.listdir(league_path):
-        if not fname.startswith("date=") or not fname.endswith(".json"):
+    def flag(self, level, msg, fixture=None, context=None):
+        totals = self.data["totals"]
+        totals["flagged"] += 1
+        if level == "CRITICAL":
+            totals["critical"] += 1
+            self.data["ok"] = False
+
+        if len(self.data["issues"]) >= MAX_ISSUES:
+            self.data["issues_truncated"] += 1
+            return
+        self.data["issues"].append({
+            "level": level,
+            "message": msg,
+            "fixture": fixture,
+            "context": context
+        })
+
+    def duplicate(self, fid):
+        if len(self.data["duplicates"]) >= MAX_DUPLICATES:
+            self.data["duplicates_truncated"] += 1
+            return
+        self.data["duplicates"].append(fid)
+
+def merge(items: List[Tuple[str, Optional[str], str, Optional[Dict]]], now: datetime) -> Dict:
+    """
+    Fold per-file results, in tree order, into one report. Items are
+    (league, date key, path, result); a None date key marks a league folder
+    outside LEAGUES_ALLOWED.
+    """
+    report = Report(now)
+    past_limit = (now - PAST_WINDOW).timestamp()
+    future_limit = (now + FUTURE_WINDOW).timestamp()
+
+    seen_ids = set()
+    seen_keys: Dict[Tuple, str] = {}
+    data = report.data
+
+    for league, date_key, path, res in items:
+        if date_key is None:
+            report.flag("ERROR", f"Unexpected league folder {league}", context=os.path.basename(path))
             continue
 
-        report["totals"]["files"] += 1
-        date_key = fname.replace("date=", "").replace(".json", "")
-        report["by_date"].setdefault(date_key, 0)
+        data["totals"]["files"] += 1
+        data["by_league"].setdefault(league, 0)
+        data["by_date"].setdefault(date_key, 0)
 
-        path = os.path.join(league_path, fname)
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        if not res["is_json"]:
+            report.flag("CRITICAL", "File is not valid JSON", context=path)
+            continue
 
-        if not isinstance(data, list):
-            flag("CRITICAL", "File does not contain a list", context=path)
+        if not res["is_list"]:
+            report.flag("CRITICAL", "File does not contain a list", context=path)
             continue
 
-        for fx in data:
-            report["totals"]["fixtures"] += 1
-            report["by_league"][league] += 1
-            report["by_date"][date_key] += 1
+        for entry in res["fixtures"]:
+            data["totals"]["fixtures"] += 1
+            data["by_league"][league] += 1
+            data["by_date"][date_key] += 1
 
-            fid = fx.get("fixture_id")
-            home = fx.get("home")
-            away = fx.get("away")
-            kickoff_raw = fx.get("kickoff_utc")
+            fx = entry["summary"]
+            fid = fx["fixture_id"]
 
             if not fid:
-                flag("CRITICAL", "Missing fixture_id", fx, path)
+                report.flag("CRITICAL", "Missing fixture_id", fx, path)
                 continue
 
-            if not home or not away:
-                flag("ERROR", "Missing home/away", fx, path)
+            if entry["missing_teams"]:
+                report.flag("ERROR", "Missing home/away", fx, path)
 
-            kickoff = parse_dt(kickoff_raw)
-            if not kickoff:
-                flag("ERROR", "Invalid kickoff_utc", fx, path)
-            else:
-                if kickoff < PAST_LIMIT or kickoff > FUTURE_LIMIT:
-                    flag("ERROR", "Kickoff outside allowed window", fx, path)
+            kickoff_ts = entry["kickoff_ts"]
+            if kickoff_ts is None:
+                report.flag("ERROR", "Invalid kickoff_utc", fx, path)
+            elif kickoff_ts < past_limit or kickoff_ts > future_limit:
+                report.flag("ERROR", "Kickoff outside allowed window", fx, path)
 
             if fid in seen_ids:
-                flag("CRITICAL", f"Duplicate fixture_id {fid}", fx, path)
-                report["duplicates"].append(fid)
+                report.flag("CRITICAL", f"Duplicate fixture_id {fid}", fx, path)
+                report.duplicate(fid)
             else:
-                seen_ids[fid] = fx
+                seen_ids.add(fid)
 
-            key = (league, home, away, kickoff_raw)
+            key = (league, fx["home"], fx["away"], fx["kickoff_utc"])
             if key in seen_keys and seen_keys[key] != fid:
-                flag("CRITICAL", "Duplicate logical fixture (same teams/time)", fx, path)
+                report.flag("CRITICAL", "Duplicate logical fixture (same teams/time)", fx, path)
             else:
                 seen_keys[key] = fid
 
-with open("fixtures_validation_report.json", "w", encoding="utf-8") as f:
-    json.dump(report, f, indent=2, ensure_ascii=False)
+    return data
+
+# =====================================================
+# RESULT CACHE (PER CONTENT HASH)
+# =====================================================
+def load_cache(path: str) -> Dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache.get("files", {}) if cache.get("version") == CACHE_VERSION else {}
+
+def save_cache(path: str, files: Dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_VERSION, "files": files}, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+
+def cached_result(entry: Optional[Dict], path: str, sig: List[int]) -> Optional[Dict]:
+    if not entry:
+        return None
+    if entry["sig"] == sig:
+        return entry["result"]
+
+    # touched but maybe not changed: compare content hashes
+    with open(path, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    return entry["result"] if entry["result"]["hash"] == digest else None
+
+# =====================================================
+# API
+# =====================================================
+def validate(
+    base: str = BASE_DIR,
+    now: Optional[datetime] = None,
+    workers: int = 1,
+    use_cache: bool = True,
+) -> Dict:
+    now = now or datetime.now(timezone.utc)
+
+    # only date files that can hold kickoffs inside the allowed window
+    files_from = (now - PAST_WINDOW - timedelta(days=DATE_PAD_DAYS)).date()
+    files_to = (now + FUTURE_WINDOW + timedelta(days=DATE_PAD_DAYS)).date()
+
+    # tree order; unexpected league folders keep their place (date key None)
+    order: List[Tuple[str, Optional[str], str]] = []
+    for league, league_path in league_dirs(base):
+        if league not in LEAGUES_ALLOWED:
+            order.append((league, None, league_path))
+            continue
+        for date_key, path in date_files(league_path, files_from, files_to):
+            order.append((league, date_key, path))
+    tasks = [t for t in order if t[1] is not None]
+
+    cache_path = os.path.join(base, CACHE_NAME)
+    cache = load_cache(cache_path) if use_cache else {}
+
+    sigs = {path: file_signature(path) for _, _, path in tasks}
+    results: Dict[str, Dict] = {}
+    stale: List[str] = []
+    for _, _, path in tasks:
+        res = cached_result(cache.get(path), path, sigs[path])
+        if res is None:
+            stale.append(path)
+        else:
+            results[path] = res
+
+    if workers > 1 and len(stale) > 1:
+        chunksize = max(1, len(stale) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            fresh = list(pool.map(validate_file, stale, chunksize=chunksize))
+    else:
+        fresh = [validate_file(path) for path in stale]
+
+    results.update(zip(stale, fresh))
+
+    if use_cache:
+        save_cache(cache_path, {
+            path: {"sig": sigs[path], "result": results[path]}
+            for _, _, path in tasks
+        })
+
+    report = merge(
+        [(league, date_key, path, results.get(path)) for league, date_key, path in order],
+        now,
+    )
+    report["totals"]["revalidated"] = len(stale)
+    return report
+
+# =====================================================
+# MAIN
+# =====================================================
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="validate changed files in N worker processes"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="revalidate every file, ignoring cached per-file results"
+    )
+    args = parser.parse_args()
+
+    report = validate(workers=args.workers, use_cache=not args.no_cache)
+
+    with open(REPORT_FILE, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print("Fixture validation completed.")
+    print("OK:", report["ok"])
+    print("Totals:", report["totals"])
+
+    # usable as a gate: non-zero exit when a CRITICAL issue was found
+    raise SystemExit(0 if report["ok"] else 1)
 
-print("Fixture validation completed.")
-print("OK:", report["ok"])
-print("Totals:", report["totals"])
+if __name__ == "__main__":
+    main()
@@ -2,8 +2,13 @@ import json
 import os
 import re
 import time
+import sys
 import requests
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "active"))
+from event_matcher import EventIndex
+from fixture_store import open_store
 
 # =========================
 # CONFIG
@@ -15,6 +20,10 @@ LEAGUES_ALLOWED = {"ENG1", "ESP1", "FRA1", "GRE1"}
 KICKOFF_TOLERANCE_SEC = 5 * 60  # 5 minutes
 CONFIDENCE_THRESHOLD = 0.95
 
+# bet365 feeds only list upcoming events; older date files are never opened
+DISCOVERY_PAST = timedelta(days=1)
+DISCOVERY_FUTURE = timedelta(days=7)
+
 BET365_HEADERS = {
     # TODO: συμπλήρωσε once
     "User-Agent": "Mozilla/5.0",
@@ -42,22 +51,16 @@ def norm(s: str) -> str:
     return s
 
 def load_fixtures():
+    now = datetime.now(timezone.utc)
     fixtures = []
-    for league_dir in os.listdir(FIXTURES_BASE):
-        if not league_dir.startswith("league="): continue
-        league = league_dir.split("=",1)[1]
-        if league not in LEAGUES_ALLOWED: continue
-        lp = os.path.join(FIXTURES_BASE, league_dir)
-        for fn in os.listdir(lp):
-            if not (fn.startswith("date=") and fn.endswith(".json")): continue
-            with open(os.path.join(lp, fn), "r", encoding="utf-8") as f:
-                data = json.load(f)
-            if not isinstance(data, list): continue
-            for fx in data:
-                if "fixture_id" in fx and isinstance(fx.get("kickoff_ts"), (int,float)):
-                    fx2 = dict(fx)
-                    fx2["league"] = league
-                    fixtures.append(fx2)
+    with open_store(FIXTURES_BASE) as store:
+        for league, fx in store.in_window(
+            LEAGUES_ALLOWED,
+            (now - DISCOVERY_PAST).timestamp(), (now + DISCOVERY_FUTURE).timestamp()
+        ):
+            if "fixture_id" in fx:
+                fx["league"] = league
+                fixtures.append(fx)
     return fixtures
 
 def fetch_bet365_events(league):
@@ -67,17 +70,16 @@ def fetch_bet365_events(league):
     r.raise_for_status()
     return r.json().get("events", [])
 
-def score_match(fx, ev):
-    score = 0.0
-    # kickoff
-    if abs(ev["kickoff_ts"] - fx["kickoff_ts"]) <= KICKOFF_TOLERANCE_SEC:
-        score += 0.5
-    # teams
-    if norm(ev["home"]) == norm(fx["home"]):
-        score += 0.25
-    if norm(ev["away"]) == norm(fx["away"]):
-        score += 0.25
-    return score
+def build_match_index(events):
+    # replaces the per-pair score_match scan with one index per league feed
+    return EventIndex(
+        events,
+        kickoff_of=lambda ev: ev["kickoff_ts"],
+        home_of=lambda ev: ev["home"],
+        away_of=lambda ev: ev["away"],
+        norm=norm,
+        tolerance_sec=KICKOFF_TOLERANCE_SEC,
+    )
 
 # =========================
 # MAIN
@@ -89,14 +91,10 @@ def main():
     for league in LEAGUES_ALLOWED:
         b365_events = fetch_bet365_events(league)
         time.sleep(0.5)
+        index = build_match_index(b365_events)
 
         for fx in [f for f in fixtures if f["league"] == league]:
-            best = None
-            best_score = 0.0
-            for ev in b365_events:
-                s = score_match(fx, ev)
-                if s > best_score:
-                    best_score, best = s, ev
+            best, best_score = index.best_match(fx["kickoff_ts"], fx["home"], fx["away"])
 
             if best and best_score >= CONFIDENCE_THRESHOLD:
                 items.append({
@@ -1,12 +1,18 @@
 import os
+import sys
 import json
-import requests
 from datetime import datetime, timezone
 from collections import defaultdict
 
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "odds-history-collector", "active"
+))
+from http_cache import cached_get
+
 EXPORT_URL = "https://aimatchlab-main.pierros1402.workers.dev/export/results"
 OUTPUT_DIR = os.path.join("data", "ft")
 TIMEOUT = 30
+CACHE_TTL_SEC = 30 * 60
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
@@ -26,10 +32,7 @@ def load_existing_dates():
 
 def main():
     print("[FT-EXPORT] Fetching export/results …")
-    resp = requests.get(EXPORT_URL, timeout=TIMEOUT)
-    resp.raise_for_status()
-
-    payload = resp.json()
+    payload = cached_get(EXPORT_URL, ttl_sec=CACHE_TTL_SEC, timeout=TIMEOUT)
     matches = payload.get("matches", [])
 
     if not matches:
@@ -0,0 +1,262 @@
+# =========================================================
+# TEAM STATS — POINT-IN-TIME (AS-OF) INDEX
+#
+# ✔ Per team: kickoffs in order + prefix sums of
+#   goals for / against, BTTS and over 2.5
+# ✔ stats_as_of(team, ts, n): bisect + O(1) arithmetic,
+#   only matches that kicked off strictly before ts
+# ✔ Sources: fixture store (fixtures/v1) or football-data CSVs
+# ✔ Backtest of value_engine_pre without future leakage
+# =========================================================
+
+import argparse
+import csv
+import os
+import sys
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "odds-history-collector", "active"
+))
+from fixture_store import open_store
+from value_engine_pre import compute_value_picks
+
+# =========================
+# CONFIG
+# =========================
+
+FIXTURES_ROOT = "odds-history-collector/fixtures/v1"
+DATA_ROOT = "data/football-data"
+LAST_N_MATCHES = 10
+
+# football-data.co.uk: dd/mm/yy (older seasons) or dd/mm/yyyy, optional HH:MM
+FD_DATE_FORMATS = ("%d/%m/%Y", "%d/%m/%y")
+
+# =========================
+# HELPERS
+# =========================
+
+def parse_fd_kickoff(date_str, time_str=""):
+    for fmt in FD_DATE_FORMATS:
+        try:
+            dt = datetime.strptime(date_str.strip(), fmt)
+            break
+        except (AttributeError, ValueError):
+            continue
+    else:
+        return None
+
+    if time_str:
+        try:
+            t = datetime.strptime(time_str.strip(), "%H:%M")
+            dt = dt.replace(hour=t.hour, minute=t.minute)
+        except ValueError:
+            pass
+    return dt.replace(tzinfo=timezone.utc).timestamp()
+
+
+def parse_iso_kickoff(val):
+    try:
+        dt = datetime.fromisoformat(str(val).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+# =========================
+# INDEX
+# =========================
+
+class TeamSeries:
+    """One team's results in kickoff order, with prefix sums (index 0 = empty)."""
+
+    __slots__ = ("ts", "gf", "ga", "btts", "over25")
+
+    def __init__(self, results):
+        self.ts = array("d")
+        self.gf = array("q", [0])
+        self.ga = array("q", [0])
+        self.btts = array("q", [0])
+        self.over25 = array("q", [0])
+
+        for ts, gf, ga in results:
+            self.ts.append(ts)
+            self.gf.append(self.gf[-1] + gf)
+            self.ga.append(self.ga[-1] + ga)
+            self.btts.append(self.btts[-1] + (1 if gf > 0 and ga > 0 else 0))
+            self.over25.append(self.over25[-1] + (1 if gf + ga >= 3 else 0))
+
+
+class AsOfIndex:
+    def __init__(self):
+        self._pending = {}
+        self.teams = {}
+
+    def add(self, ts, home, away, hg, ag):
+        self._pending.setdefault(home, []).append((ts, hg, ag))
+        self._pending.setdefault(away, []).append((ts, ag, hg))
+
+    def build(self):
+        # stable sort: same-kickoff results keep their load order
+        for team, results in self._pending.items():
+            results.sort(key=lambda r: r[0])
+            self.teams[team] = TeamSeries(results)
+        self._pending = {}
+        return self
+
+    def stats_as_of(self, team, ts, n=LAST_N_MATCHES):
+        """team_stats.json-style stats over the last n results before ts."""
+        series = self.teams.get(team)
+        end = bisect_left(series.ts, ts) if series else 0
+        start = max(0, end - n)
+        used = end - start
+
+        def avg(prefix):
+            return round((prefix[end] - prefix[start]) / used, 3)
+
+        if not used:
+            return {
+                "matches_used": 0,
+                "goals_for_avg": 0.0,
+                "goals_against_avg": 0.0,
+                "btts_rate": 0.0,
+                "over25_rate": 0.0
+            }
+
+        return {
+            "matches_used": used,
+            "goals_for_avg": avg(series.gf),
+            "goals_against_avg": avg(series.ga),
+            "btts_rate": avg(series.btts),
+            "over25_rate": avg(series.over25)
+        }
+
+# =========================
+# LOADERS
+# =========================
+
+def matches_from_fixture_store(root=FIXTURES_ROOT):
+    with open_store(root) as store:
+        for _, m in store.finished_with_teams():
+            hg, ag = m.get("homeGoals"), m.get("awayGoals")
+            if not isinstance(hg, int) or not isinstance(ag, int):
+                continue
+
+            ts = m.get("kickoff_ts")
+            if not isinstance(ts, (int, float)):
+                ts = parse_iso_kickoff(m.get("kickoff", m.get("date", "")))
+            if ts is None:
+                continue
+
+            yield {
+                "ts": ts,
+                "homeId": str(m["homeId"]),
+                "awayId": str(m["awayId"]),
+                "homeGoals": hg,
+                "awayGoals": ag
+            }
+
+
+def matches_from_football_data(root=DATA_ROOT):
+    for league in sorted(os.listdir(root)):
+        league_path = os.path.join(root, league)
+        if not os.path.isdir(league_path):
+            continue
+
+        for fname in sorted(os.listdir(league_path)):
+            if not fname.lower().endswith(".csv"):
+                continue
+
+            with open(os.path.join(league_path, fname), newline="", encoding="utf-8", errors="ignore") as f:
+                for r in csv.DictReader(f):
+                    try:
+                        home = r["HomeTeam"].strip()
+                        away = r["AwayTeam"].strip()
+                        hg = int(r["FTHG"])
+                        ag = int(r["FTAG"])
+                    except Exception:
+                        continue
+
+                    ts = parse_fd_kickoff(r.get("Date", ""), r.get("Time", ""))
+                    if ts is None:
+                        continue
+
+                    yield {
+                        "ts": ts,
+                        "home": home,
+                        "away": away,
+                        "homeGoals": hg,
+                        "awayGoals": ag
+                    }
+
+
+def build_index(matches):
+    index = AsOfIndex()
+    for m in matches:
+        home = m.get("homeId") or m.get("home")
+        away = m.get("awayId") or m.get("away")
+        index.add(m["ts"], home, away, m["homeGoals"], m["awayGoals"])
+    return index.build()
+
+# =========================
+# BACKTEST
+# =========================
+
+def backtest(index, matches, n=LAST_N_MATCHES):
+    """
+    Run value_engine_pre on every match with the stats known before its
+    kickoff and score the picks against the final result.
+    """
+    results = {}
+
+    for m in matches:
+        home = m.get("homeId") or m.get("home")
+        away = m.get("awayId") or m.get("away")
+        stats = {
+            home: index.stats_as_of(home, m["ts"], n),
+            away: index.stats_as_of(away, m["ts"], n),
+        }
+
+        hg, ag = m["homeGoals"], m["awayGoals"]
+        hits = {
+            "BTTS": hg > 0 and ag > 0,
+            "Over 2.5": hg + ag >= 3,
+        }
+
+        for pick in compute_value_picks([m], team_stats=stats):
+            r = results.setdefault(pick["market"], {"picks": 0, "hits": 0})
+            r["picks"] += 1
+            r["hits"] += 1 if hits[pick["market"]] else 0
+
+    for r in results.values():
+        r["hit_rate"] = round(r["hits"] / r["picks"], 3)
+    return results
+
+# =========================
+# ENTRY
+# =========================
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--source", choices=["football-data", "fixtures"], default="football-data",
+        help="results to index and backtest"
+    )
+    parser.add_argument("--last-n", type=int, default=LAST_N_MATCHES)
+    args = parser.parse_args()
+
+    if args.source == "fixtures":
+        matches = list(matches_from_fixture_store())
+    else:
+        matches = list(matches_from_football_data())
+
+    index = build_index(matches)
+    results = backtest(index, matches, args.last_n)
+
+    print(f"[ASOF] {len(matches)} matches, {len(index.teams)} teams")
+    for market, r in sorted(results.items()):
+        print(f"  {market:<9} picks: {r['picks']:>6}  hits: {r['hits']:>6}  hit rate: {r['hit_rate']}")
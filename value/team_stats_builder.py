@@ -3,14 +3,23 @@
 # v1.3 FINAL — GOALS-BASED FINISHED LOGIC
 #
 # ✔ Reads fixtures from odds-history-collector/fixtures/v1
+#   (through the indexed fixture store)
 # ✔ Finished = homeGoals & awayGoals exist
 # ✔ No status assumptions
 # ✔ Builds team_stats.json
+# ✔ Incremental: only results imported since the last run
 # =========================================================
 
+import argparse
 import json
 import os
-from statistics import mean
+import sys
+from collections import deque
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "odds-history-collector", "active"
+))
+from fixture_store import open_store
 
 # =========================
 # CONFIG
@@ -20,121 +29,174 @@ FIXTURES_ROOT = "odds-history-collector/fixtures/v1"
 OUTPUT_FILE = "value/team_stats.json"
 LAST_N_MATCHES = 10
 
+# rolling windows + watermark (store id, import seq) of the last import ingested
+STATE_FILE = "value/team_stats_state.json"
+STATE_VERSION = 2
+
 # =========================
 # HELPERS
 # =========================
 
-def safe_mean(values):
-    values = [v for v in values if isinstance(v, (int, float))]
-    return mean(values) if values else 0.0
-
-
-def load_json(path):
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-
 def has_final_score(match):
     return (
         isinstance(match.get("homeGoals"), int)
         and isinstance(match.get("awayGoals"), int)
     )
 
-# =========================
-# MAIN
-# =========================
 
-def run_builder():
-    team_matches = {}
+def kickoff_key(match):
+    return match.get("kickoff", match.get("date", ""))
 
-    # -------------------------------------------------
-    # Traverse fixtures tree
-    # -------------------------------------------------
-    for league_dir in sorted(os.listdir(FIXTURES_ROOT)):
-        if not league_dir.startswith("league="):
-            continue
 
-        league_path = os.path.join(FIXTURES_ROOT, league_dir)
-        if not os.path.isdir(league_path):
-            continue
+def ratio(total, n):
+    # same values as statistics.mean over n ints (an int when exact)
+    if not n:
+        return 0.0
+    return total // n if total % n == 0 else total / n
 
-        for fname in sorted(os.listdir(league_path)):
-            if not fname.startswith("date=") or not fname.endswith(".json"):
-                continue
 
-            fpath = os.path.join(league_path, fname)
-            data = load_json(fpath)
+def write_json(path, payload, **kwargs):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, **kwargs)
+    os.replace(tmp, path)
 
-            if not isinstance(data, list):
-                continue
+# =========================
+# ROLLING WINDOW
+# =========================
+
+class TeamWindow:
+    """
+    Last LAST_N_MATCHES results of one team as (kickoff, gf, ga), oldest
+    first, with running sums so stats never rescan the window.
+    """
+
+    __slots__ = ("matches", "gf", "ga", "btts", "over25")
+
+    def __init__(self, n=LAST_N_MATCHES):
+        self.matches = deque(maxlen=n)
+        self.gf = self.ga = self.btts = self.over25 = 0
+
+    def _add(self, gf, ga, sign):
+        self.gf += sign * gf
+        self.ga += sign * ga
+        self.btts += sign * (1 if gf > 0 and ga > 0 else 0)
+        self.over25 += sign * (1 if gf + ga >= 3 else 0)
+
+    def push(self, kickoff, gf, ga):
+        # common case: newer than everything kept
+        if not self.matches or kickoff > self.matches[-1][0]:
+            if len(self.matches) == self.matches.maxlen:
+                _, old_gf, old_ga = self.matches[0]
+                self._add(old_gf, old_ga, -1)
+            self.matches.append((kickoff, gf, ga))
+            self._add(gf, ga, 1)
+            return
+
+        # late or corrected result: upsert by kickoff, keep the newest N
+        kept = {k: (k, f, a) for k, f, a in self.matches}
+        if len(self.matches) == self.matches.maxlen and kickoff < self.matches[0][0]:
+            return
+        kept[kickoff] = (kickoff, gf, ga)
+
+        self.matches.clear()
+        self.gf = self.ga = self.btts = self.over25 = 0
+        for k in sorted(kept)[-self.matches.maxlen:]:
+            self.matches.append(kept[k])
+            self._add(kept[k][1], kept[k][2], 1)
+
+    def stats(self):
+        n = len(self.matches)
+        return {
+            "matches_used": n,
+            "goals_for_avg": round(ratio(self.gf, n), 3),
+            "goals_against_avg": round(ratio(self.ga, n), 3),
+            "btts_rate": round(ratio(self.btts, n), 3),
+            "over25_rate": round(ratio(self.over25, n), 3)
+        }
+
+# =========================
+# STATE (WINDOWS + WATERMARK)
+# =========================
 
-            for m in data:
-                if not isinstance(m, dict):
-                    continue
+def load_state():
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None, None, {}
+
+    if state.get("version") != STATE_VERSION or state.get("last_n") != LAST_N_MATCHES:
+        return None, None, {}
+
+    windows = {}
+    for team_id, matches in state.get("teams", {}).items():
+        win = windows[team_id] = TeamWindow()
+        for kickoff, gf, ga in matches:
+            win.push(kickoff, gf, ga)
+    return state.get("store_id"), state.get("watermark"), windows
+
+
+def save_state(store_id, watermark, windows):
+    write_json(STATE_FILE, {
+        "version": STATE_VERSION,
+        "last_n": LAST_N_MATCHES,
+        "store_id": store_id,
+        "watermark": watermark,
+        "teams": {team_id: list(win.matches) for team_id, win in windows.items()},
+    }, separators=(",", ":"))
+
+# =========================
+# MAIN
+# =========================
 
-                # ✅ FINISHED = score exists
-                if not has_final_score(m):
-                    continue
+def run_builder(full=False):
+    store_id, watermark, windows = (None, None, {}) if full else load_state()
 
-                hid = m.get("homeId")
-                aid = m.get("awayId")
+    # -------------------------------------------------
+    # Finished fixtures imported since the watermark
+    # -------------------------------------------------
+    new_matches = []
+    with open_store(FIXTURES_ROOT) as store:
+        if store_id != store.store_id:
+            # rebuilt store: its import seqs started over
+            watermark, windows = None, {}
+        store_id = store.store_id
+        until = store.last_import_seq()
+        for _, m in store.finished_with_teams(since=watermark, until=until):
+            # ✅ FINISHED = score exists
+            if not has_final_score(m):
+                continue
 
-                if not hid or not aid:
-                    continue
+            if not m.get("homeId") or not m.get("awayId"):
+                continue
 
-                team_matches.setdefault(hid, []).append(m)
-                team_matches.setdefault(aid, []).append(m)
+            new_matches.append(m)
 
     # -------------------------------------------------
-    # Build per-team stats
+    # Fold into the rolling windows (chronological)
     # -------------------------------------------------
-    team_stats = {}
-
-    for team_id, matches in team_matches.items():
-        matches_sorted = sorted(
-            matches,
-            key=lambda x: x.get("kickoff", x.get("date", ""))
-        )
-
-        recent = matches_sorted[-LAST_N_MATCHES:]
-
-        goals_for = []
-        goals_against = []
-        btts = []
-        over25 = []
-
-        for m in recent:
-            if m.get("homeId") == team_id:
-                gf = m.get("homeGoals")
-                ga = m.get("awayGoals")
-            else:
-                gf = m.get("awayGoals")
-                ga = m.get("homeGoals")
-
-            goals_for.append(gf)
-            goals_against.append(ga)
-            btts.append(1 if gf > 0 and ga > 0 else 0)
-            over25.append(1 if (gf + ga) >= 3 else 0)
-
-        team_stats[team_id] = {
-            "matches_used": len(recent),
-            "goals_for_avg": round(safe_mean(goals_for), 3),
-            "goals_against_avg": round(safe_mean(goals_against), 3),
-            "btts_rate": round(safe_mean(btts), 3),
-            "over25_rate": round(safe_mean(over25), 3)
-        }
+    new_matches.sort(key=kickoff_key)
+
+    for m in new_matches:
+        kickoff = kickoff_key(m)
+        hg, ag = m["homeGoals"], m["awayGoals"]
+        windows.setdefault(str(m["homeId"]), TeamWindow()).push(kickoff, hg, ag)
+        windows.setdefault(str(m["awayId"]), TeamWindow()).push(kickoff, ag, hg)
+
+    team_stats = {team_id: win.stats() for team_id, win in windows.items()}
 
     # -------------------------------------------------
     # Write output
     # -------------------------------------------------
     os.makedirs("value", exist_ok=True)
 
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(team_stats, f, ensure_ascii=False, indent=2)
+    write_json(OUTPUT_FILE, team_stats, indent=2)
+    save_state(store_id, until, windows)
 
     print(
         f"[STATS] team_stats.json generated — "
-        f"{len(team_stats)} teams (fixtures/v1)"
+        f"{len(team_stats)} teams, {len(new_matches)} new results (fixtures/v1)"
     )
 
 # =========================
@@ -142,4 +204,9 @@ def run_builder():
 # =========================
 
 if __name__ == "__main__":
-    run_builder()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--full", action="store_true",
+        help="ignore the saved windows and rebuild from every fixture"
+    )
+    run_builder(full=parser.parse_args().full)
@@ -4,7 +4,7 @@
 #
 # ✔ Input: matches (list of dicts)
 # ✔ Output: value picks (list of dicts)
-# ✔ Uses: value/team_stats.json
+# ✔ Uses: value/team_stats.json (or caller-supplied stats)
 #
 # This module DOES NOT:
 # - read fixtures from disk
@@ -55,7 +55,7 @@ def _extract_team_ids(match):
 # PUBLIC API
 # =========================
 
-def compute_value_picks(matches):
+def compute_value_picks(matches, team_stats=None):
     """
     Compute value picks for upcoming matches.
 
@@ -64,6 +64,9 @@ def compute_value_picks(matches):
             required keys per match:
               - homeId or home
               - awayId or away
+        team_stats (dict, optional): team id -> stats, same shape as
+            team_stats.json (e.g. point-in-time stats for backtests);
+            defaults to value/team_stats.json
 
     Returns:
         list of value pick dicts
@@ -72,7 +75,8 @@ def compute_value_picks(matches):
     if not isinstance(matches, list):
         raise TypeError("matches must be a list")
 
-    team_stats = _load_team_stats()
+    if team_stats is None:
+        team_stats = _load_team_stats()
     value_picks = []
 
     for m in matches: